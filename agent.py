@@ -1,134 +1,46 @@
-import time
-import gymnasium as gym
 from gymnasium import spaces
 import numpy as np
 from game import Game
+from observation import ObservationBuilder
+from profiler import StepProfiler
+from snake_env import SnakeGameEnv
 
-class SnakeEnv(gym.Env):
-    metadata = {'render.modes': ['human']}
+class SnakeEnv(SnakeGameEnv):
 
-    def __init__(self, show: bool = True, grid_size=5):
-        super(SnakeEnv, self).__init__()
-        self.game = Game()
-        self.action_space = spaces.Discrete(3)  # 1 = same dir; 2 = left; 3 = right
-        self.show_ui = show
-        self.ai_score = 0
-        self.bot_score = 0
-        self.grid_size = grid_size
+    # reward function for snake 1 if the game is over or snake 2 gets the apple
+    REWARDS = {
+        2: 0,
+        1: 50,
+        -1: -50,
+    }
+
+    # rewards if nothing happens and for the apple, with the opponent close / far
+    CLOSE_REWARDS = (0.5, 0.05)
+    FAR_REWARDS = (0.02, 7)
+
+    def __init__(self, show: bool = True, grid_size=5, profiler: StepProfiler = None, copy_obs: bool = True,
+                 snake_2_type: str = "bot", game: Game = None):
+        super(SnakeEnv, self).__init__(show, grid_size, profiler, copy_obs, snake_2_type, game)
+        self.observer = ObservationBuilder(self.game.board.cols, self.game.board.rows, grid_size, deadly=False)
 
         # Define the observation space
         num_cells = grid_size * grid_size
         self.observation_space = spaces.Box(low=-1, high=3, shape=(num_cells + 8,), dtype=np.float32)
 
-    def reset(self, seed=None):
-        self.game = Game()
-        return (self._get_observation(), {})
-
-    def step(self, action):
-        if action == 1:  # maintain current direction
-            pass
-        elif action == 2:  # turn left
-            self.game.snake_1.direction = (-self.game.snake_1.direction[1], self.game.snake_1.direction[0])
-        elif action == 0:  # turn right
-            self.game.snake_1.direction = (self.game.snake_1.direction[1], -self.game.snake_1.direction[0])
-
-        self.game.play_step()
-        obs = self._get_observation()
-        done = abs(self.game.game_state) == 1
-
-        # Calculate distance to the closest cell of the opponent snake
-        head_x, head_y = self.game.snake_1.body[0]
-        opponent_cells = self.game.snake_2.body
-        distances_to_opponent = [np.sqrt((cell[0] - head_x) ** 2 + (cell[1] - head_y) ** 2) for cell in opponent_cells]
-        min_distance_to_opponent = min(distances_to_opponent)
-
-        # Adjust reward values based on the distance to the opponent snake
-        if min_distance_to_opponent < 3:  # opponent is close
-            reward_for_0 = 0.5
-            reward_for_apple = 0.05
-        else:  # opponent is far
-            reward_for_0 = 0.02
-            reward_for_apple = 7
-
-        # Calculate distance to the center of the grid
-        center_x, center_y = self.game.w // (2 * self.game.block_size), self.game.h // (2 * self.game.block_size)
-        distance_to_center = np.sqrt((center_x - head_x) ** 2 + (center_y - head_y) ** 2)
-
-        # Add a small reward for being close to the center
-        center_reward = max(0, 1 - distance_to_center / max(center_x, center_y)) * 0.1
-
-        # reward function for snake 1
-        rewards = {
-            2: 0,
-            1: 50,
-            0: reward_for_0 + center_reward,
-            -1: -50,
-            -2: reward_for_apple
-        }
-
-        reward = rewards[self.game.game_state]
+    def _reward(self, game_state: int) -> float:
+        if game_state == 0 or game_state == -2:
+            # distance to the opponent and center reward were computed with the observation
+            features = self.observer.step_features
 
-        # Update scores based on game state
-        if self.game.game_state == 1:
-            self.ai_score += 1
-        elif self.game.game_state == -1:
-            self.bot_score += 1
+            # Adjust reward values based on the distance to the opponent snake
+            if features.min_distance_to_opponent < 3:  # opponent is close
+                reward_for_0, reward_for_apple = self.CLOSE_REWARDS
+            else:  # opponent is far
+                reward_for_0, reward_for_apple = self.FAR_REWARDS
 
-        terminated = done
-        truncated = False  # Set this to True if you have a time limit or other truncation condition
-
-        return obs, reward, terminated, truncated, {}
-
-    def render(self, mode='human'):
-        self.game.update_ui()
-        if self.show_ui:
-            time.sleep(0.03)  # Add a delay
-
-    def _get_observation(self):
-        if self.show_ui:
-            self.render()
-        head_x, head_y = self.game.snake_1.body[0]
-        half_size = self.grid_size // 2
-        surrounding = [
-            (head_x + dx, head_y + dy)
-            for dx in range(-half_size, half_size + 1)
-            for dy in range(-half_size, half_size + 1)
-        ]
-        observation = []
-        for cell in surrounding:
-            if cell in self.game.snake_1.body:
-                observation.append(1)  # AI snake body
-            elif cell in self.game.snake_2.body:
-                observation.append(2)  # Player snake body
-            elif cell == (self.game.apple.x // self.game.block_size, self.game.apple.y // self.game.block_size):
-                observation.append(3)  # Apple
-            elif 0 <= cell[0] < self.game.w // self.game.block_size and 0 <= cell[
-                1] < self.game.h // self.game.block_size:
-                observation.append(0)  # Empty space
-            else:
-                observation.append(-1)  # Wall
-
-        # Calculate distance and direction to the apple
-        apple_x, apple_y = self.game.apple.x // self.game.block_size, self.game.apple.y // self.game.block_size
-        distance_to_apple = np.sqrt((apple_x - head_x) ** 2 + (apple_y - head_y) ** 2)
-        direction_to_apple = (apple_x - head_x, apple_y - head_y)
-
-        # Append distance and direction to the observation
-        observation.append(distance_to_apple)
-        observation.extend(direction_to_apple)
-
-        # Append the direction of the AI snake
-        direction_snake_1 = self.game.snake_1.direction
-        observation.extend(direction_snake_1)
-
-        # Calculate distances to the closest 3 cells of the opponent snake
-        opponent_cells = self.game.snake_2.body
-        distances_to_opponent = sorted(
-            [np.sqrt((cell[0] - head_x) ** 2 + (cell[1] - head_y) ** 2) for cell in opponent_cells]
-        )[:3]
-        observation.extend(distances_to_opponent)
-
-        return np.array(observation)
+            # Add a small reward for being close to the center
+            return reward_for_0 + features.center_reward if game_state == 0 else reward_for_apple
+        return self.REWARDS[game_state]
 
 if __name__ == '__main__':
     env = SnakeEnv()
@@ -144,3 +56,5 @@ if __name__ == '__main__':
             elif np.any(obs == -1):
                 print("Game Over! Player 2 wins!")
             break
+
+    env.close()  # shows the remaining frames for a few seconds
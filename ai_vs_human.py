@@ -1,160 +1,216 @@
 import time
-import gymnasium as gym
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from gymnasium import spaces
 import numpy as np
+from numpy_policy import NumpyPolicy
 from game import Game
-from stable_baselines3 import PPO
-
-class SafeSnakeEnvAgainstHuman(gym.Env):
-    metadata = {'render.modes': ['human']}
-
-    def __init__(self, show: bool = True, grid_size=5):
-        super(SafeSnakeEnvAgainstHuman, self).__init__()
-        self.game = Game(snake_2_type="player")
-        self.action_space = spaces.Discrete(3)  # 1 = same dir; 2 = left; 3 = right
+from observation import ObservationBuilder
+from profiler import StepProfiler
+from snake_env import SnakeGameEnv
+from snake import PlayerSnake
+
+class SafeSnakeEnvAgainstHuman(SnakeGameEnv):
+
+    # reward function for snake 1
+    REWARDS = {
+        2: 0,
+        1: 50,
+        0: 0.1,
+        -1: -50,
+        -2: 3
+    }
+
+    def __init__(self, show: bool = True, grid_size=5, profiler: StepProfiler = None, copy_obs: bool = True,
+                 snake_2_type: str = "player", game: Game = None):
+        """
+        :param snake_2_type: player - the game reads the arrow keys itself on every step, snake - the caller sets
+                             the direction of snake 2, e.g. play with its buffered key presses
+        :param game: see SnakeGameEnv
+        """
+        assert snake_2_type in ["player", "snake"], f"Invalid snake type for the human: Input - {snake_2_type}, Expected - player/snake"
+        # the game is drawn by a Renderer on the thread of the game loop instead of a Viewer
+        super(SafeSnakeEnvAgainstHuman, self).__init__(False, grid_size, profiler, copy_obs, snake_2_type, game)
         self.show_ui = show
-        self.ai_score = 0
-        self.bot_score = 0
-        self.grid_size = grid_size
+        self.renderer = None  # headless unless the game is shown
+        if show:
+            from renderer import Renderer  # pygame is only loaded for a window
+            self.renderer = Renderer(self.game)
+        self.observer = ObservationBuilder(self.game.board.cols, self.game.board.rows, grid_size, deadly=True)
 
         # Define the observation space
         num_cells = grid_size * grid_size
         self.observation_space = spaces.Box(low=-1, high=3, shape=(num_cells + 11,), dtype=np.float32)
 
-    def reset(self, seed=None):
-        self.game = Game(snake_2_type="player")
-        return (self._get_observation(), {})
-
     def is_deadly(self):
-        directions = [
-            self.game.snake_1.direction,  # current direction
-            (-self.game.snake_1.direction[1], self.game.snake_1.direction[0]),  # left
-            (self.game.snake_1.direction[1], -self.game.snake_1.direction[0])  # right
-        ]
-        deadly = []
-
-        for direction in directions:
-            head_x, head_y = self.game.snake_1.body[0]
-            new_head_x = head_x + direction[0]
-            new_head_y = head_y + direction[1]
-
-            # Check for collision with walls
-            if new_head_x < 0 or new_head_x >= self.game.w // self.game.block_size or new_head_y < 0 or new_head_y >= self.game.h // self.game.block_size:
-                deadly.append(1)
-                continue
+        """ Whether going straight, left or right is deadly for snake 1 """
+        return [int(deadly) for deadly in self.observer.deadly_moves(self.game)]
 
-            # Check for collision with itself
-            if (new_head_x, new_head_y) in self.game.snake_1.body:
-                deadly.append(1)
-                continue
+    def render(self, mode='human'):
+        """ Draw the current state, the game loop is paced by the caller """
+        self.game.update_ui()
 
-            # Check for collision with the other snake
-            if (new_head_x, new_head_y) in self.game.snake_2.body:
-                deadly.append(1)
+TICK_SPEED = 20  # ticks per second of the game against the human
+PROFILE: str = None  # e.g. "profile_human.json" to record per-phase timings of the game loop
+
+# arrow keys by their pygame name and the direction they turn the snake of the human into
+KEY_DIRECTIONS = {
+    "left": (-1, 0),
+    "right": (1, 0),
+    "up": (0, -1),
+    "down": (0, 1),
+}
+
+KeyPress = namedtuple('KeyPress', 'earliest, time, direction')
+
+
+class KeyBuffer:
+    """
+    Arrow key presses of the human, applied one per tick. pygame events carry no timestamp, so a press is
+    only known to have happened between the previous poll (earliest) and the poll that read it (time). Quick presses
+    between two ticks (e.g. up and left to turn around a corner) are all kept instead of the last one
+    overwriting the others. A press reversing or repeating the direction the snake will have at that
+    point is ignored.
+    """
+
+    def __init__(self, size: int = 3):
+        """
+        :param size: maximum number of presses waiting for a tick, further presses are dropped
+        """
+        self.presses = deque()
+        self.size = size
+        self.direction = None  # direction of the snake after all buffered presses
+        self.last_poll = time.perf_counter()  # the event queue was empty at this time
+
+    def reset(self, direction: tuple[int, int]) -> None:
+        """ Forget all presses, e.g. on a new game, the snake moves in the given direction """
+        self.presses.clear()
+        self.direction = direction
+
+    def poll(self) -> bool:
+        """
+        Read all pending pygame events
+        :return: False if the window was closed
+        """
+        import pygame
+
+        earliest = self.last_poll
+        events = pygame.event.get()
+        now = self.last_poll = time.perf_counter()
+        for event in events:
+            if event.type == pygame.QUIT:
+                return False
+            if event.type != pygame.KEYDOWN or len(self.presses) >= self.size:
                 continue
+            direction = KEY_DIRECTIONS.get(pygame.key.name(event.key))
+            if direction is not None and direction != self.direction \
+                    and direction != (-self.direction[0], -self.direction[1]):
+                self.presses.append(KeyPress(earliest, now, direction))
+                self.direction = direction
+        return True
+
+    def pop(self) -> KeyPress:
+        """ Oldest buffered press or None """
+        return self.presses.popleft() if self.presses else None
+
+
+def latency_report(name: str, seconds: list[float]) -> str:
+    """ Mean, median, 95th percentile and maximum of a list of durations in milliseconds """
+    if not seconds:
+        return f"{name}: no samples"
+    ms = np.array(seconds) * 1000
+    return (f"{name}: mean {ms.mean():.1f}ms, median {np.median(ms):.1f}ms, "
+            f"p95 {np.percentile(ms, 95):.1f}ms, max {ms.max():.1f}ms ({len(ms)} samples)")
+
+
+def play(env: SafeSnakeEnvAgainstHuman, model, games: int = 1, tick_speed: int = TICK_SPEED, profiler: StepProfiler = None) -> dict:
+    """
+    Game loop of the AI (snake 1) against the human (snake 2, arrow keys) with a low and steady input lag.
+    Between two ticks the keyboard is read every millisecond into a KeyBuffer, while the action of the AI
+    for the next tick is already computed on a worker thread from the observation of the last tick. The
+    ticks are paced by a pygame Clock, the last milliseconds before a tick are waited in a busy loop so the
+    tick interval hardly varies.
+    :param model: policy with predict, e.g. NumpyPolicy
+    :param games: number of games to play
+    :return: seconds from key press to the drawn move, at least ("input", from the poll that read the press) and
+             at most ("input_max", from the poll before), between ticks ("tick") and waited for the action of the
+             AI at a tick ("inference")
+    """
+    import pygame
+
+    assert not isinstance(env.game.snake_2, PlayerSnake), \
+        "play reads the keyboard itself, create the env with snake_2_type=\"snake\""
+    clock = pygame.time.Clock()
+    keys = KeyBuffer()
+    interval = 1 / tick_speed
+    stats = {"input": [], "input_max": [], "tick": [], "inference": []}
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        obs, info = env.reset()
+        keys.reset(env.game.snake_2.direction)
+        env.render()
+        action = executor.submit(model.predict, obs)
+
+        played = 0
+        last_tick = time.perf_counter()
+        while played < games:
+            # read the keyboard until shortly before the tick, the rest is waited exactly by the clock
+            while time.perf_counter() < last_tick + interval - 0.002:
+                if not keys.poll():
+                    return stats
+                pygame.time.wait(1)
+            clock.tick_busy_loop(tick_speed)
+
+            now = time.perf_counter()
+            stats["tick"].append(now - last_tick)
+            last_tick = now
+            if not keys.poll():
+                return stats
+
+            # move of the human, the oldest buffered key press
+            press = keys.pop()
+            if press is not None:
+                env.game.snake_2.direction = press.direction
+
+            # move of the AI, computed while waiting for the tick
+            if profiler is not None:
+                t = profiler.start()
+            action_1, _states = action.result()
+            stats["inference"].append(time.perf_counter() - now)
+            if profiler is not None:
+                profiler.record("predict", t)
+
+            obs, rewards, done, truncated, info = env.step(action_1)
+            env.render()
+            if press is not None:
+                drawn = time.perf_counter()
+                stats["input"].append(drawn - press.time)
+                stats["input_max"].append(drawn - press.earliest)
+
+            if done:
+                played += 1
+                obs, info = env.reset()
+                keys.reset(env.game.snake_2.direction)
+                env.render()
+
+            # the AI computes its next move while the loop waits for the tick
+            action = executor.submit(model.predict, obs)
+
+    return stats
 
-            deadly.append(0)
-
-        return deadly
-
-    def step(self, action):
-        if action == 1:  # maintain current direction
-            pass
-        elif action == 2:  # turn left
-            self.game.snake_1.direction = (-self.game.snake_1.direction[1], self.game.snake_1.direction[0])
-        elif action == 0:  # turn right
-            self.game.snake_1.direction = (self.game.snake_1.direction[1], -self.game.snake_1.direction[0])
-
-        self.game.play_step()
-        obs = self._get_observation()
-        done = abs(self.game.game_state) == 1
-
-        # reward function for snake 1
-        rewards = {
-            2: 0,
-            1: 50,
-            0: 0.1,
-            -1: -50,
-            -2: 3
-        }
-
-        reward = rewards[self.game.game_state]
-
-        # Update scores based on game state
-        if self.game.game_state == 1:
-            self.ai_score += 1
-        elif self.game.game_state == -1:
-            self.bot_score += 1
-
-        terminated = done
-        truncated = False  # Set this to True if you have a time limit or other truncation condition
-
-        return obs, reward, terminated, truncated, {}
-
-    def render(self, mode='human'):
-        self.game.update_ui()
-        if self.show_ui:
-            time.sleep(0.05)  # Add a delay
-
-    def _get_observation(self):
-        if self.show_ui:
-            self.render()
-        head_x, head_y = self.game.snake_1.body[0]
-        half_size = self.grid_size // 2
-        surrounding = [
-            (head_x + dx, head_y + dy)
-            for dx in range(-half_size, half_size + 1)
-            for dy in range(-half_size, half_size + 1)
-        ]
-        observation = []
-        for cell in surrounding:
-            if cell in self.game.snake_1.body:
-                observation.append(1)  # AI snake body
-            elif cell in self.game.snake_2.body:
-                observation.append(2)  # Player snake body
-            elif cell == (self.game.apple.x // self.game.block_size, self.game.apple.y // self.game.block_size):
-                observation.append(3)  # Apple
-            elif 0 <= cell[0] < self.game.w // self.game.block_size and 0 <= cell[
-                1] < self.game.h // self.game.block_size:
-                observation.append(0)  # Empty space
-            else:
-                observation.append(-1)  # Wall
-
-        # Calculate distance and direction to the apple
-        apple_x, apple_y = self.game.apple.x // self.game.block_size, self.game.apple.y // self.game.block_size
-        distance_to_apple = np.sqrt((apple_x - head_x) ** 2 + (apple_y - head_y) ** 2)
-        direction_to_apple = (apple_x - head_x, apple_y - head_y)
-
-        # Append distance and direction to the observation
-        observation.append(distance_to_apple)
-        observation.extend(direction_to_apple)
-
-        # Append the direction of the AI snake
-        direction_snake_1 = self.game.snake_1.direction
-        observation.extend(direction_snake_1)
-
-        # Calculate distances to the closest 3 cells of the opponent snake
-        opponent_cells = self.game.snake_2.body
-        distances_to_opponent = sorted(
-            [np.sqrt((cell[0] - head_x) ** 2 + (cell[1] - head_y) ** 2) for cell in opponent_cells]
-        )[:3]
-        observation.extend(distances_to_opponent)
-
-        observation.extend(self.is_deadly())
-
-        return np.array(observation)
 
 if __name__ == '__main__':
-    env = SafeSnakeEnvAgainstHuman()
-    model = PPO.load(f"ppo_snake_safe_5.zip")
-
-    # Test the trained model
-    obs, info = env.reset()
-    games = 0
-    while games < 1:
-        action, _states = model.predict(obs)
-        obs, rewards, done, truncated, info = env.step(action)
-        env.render()
-        if done:
-            games += 1
-            obs, info = env.reset()
\ No newline at end of file
+    profiler = StepProfiler() if PROFILE else None
+    env = SafeSnakeEnvAgainstHuman(profiler=profiler, snake_2_type="snake")
+    model = NumpyPolicy("ppo_snake_safe_5.npz")  # exported by export_policy.py, runs without torch
+
+    stats = play(env, model, games=1, profiler=profiler)
+    # the press happened between two polls of the keyboard, the latency lies between these bounds
+    print(latency_report("input to move, lower bound", stats["input"]))
+    print(latency_report("input to move, upper bound", stats["input_max"]))
+    print(latency_report("tick interval", stats["tick"]))
+    print(latency_report("wait for AI", stats["inference"]))
+
+    if profiler is not None:
+        profiler.dump(PROFILE)
+        print(profiler.report())
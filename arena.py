@@ -0,0 +1,254 @@
+import random
+import time
+from collections import deque
+
+from game_state import DIRECTIONS, TURNS
+
+COLS = 200
+ROWS = 200
+SNAKES = 64
+
+
+class Arena:
+    """
+    Snake game for any board size and any number of snakes. All snakes share one spatial index, the owner
+    of every cell (x * rows + y), and the cells without snake or apple are kept in an array with swap-remove
+    like in Board, so a tick and an apple placement cost O(number of snakes) no matter how large the board
+    or how long the snakes are.
+
+    The moves are simultaneous and resolved in one pass: all tails that move away are released first,
+    then a snake dies if its new head leaves the board, lands on any body (including its own and the
+    neck when reversing) or on the same cell as another head. Dead snakes are removed from the board.
+    A snake that eats an apple grows in the following tick like in Game.
+    """
+
+    def __init__(self, cols: int = COLS, rows: int = ROWS, n_snakes: int = SNAKES, length: int = 5, apples: int = None,
+                 seed: int = None):
+        """
+        :param length: initial length of every snake
+        :param apples: number of apples on the board, one per snake by default
+        :param seed: seed of the random number generator for the start positions and apples
+        """
+        assert n_snakes * length <= cols * rows // 2, "Board too small for the snakes"
+        self.cols = cols
+        self.rows = rows
+        self.n_snakes = n_snakes
+        self.length = length
+        self.n_apples = n_snakes if apples is None else apples
+        self.random = random.Random(seed)
+
+        n_cells = cols * rows
+        self.owner = [-1] * n_cells  # cell -> index of the snake covering it, -1 if free
+        self.free = list(range(n_cells))  # the first n_free entries are the cells without snake or apple
+        self.free_index = list(range(n_cells))  # cell -> position in free
+        self.n_free = n_cells
+
+        self.bodies = [deque() for _ in range(n_snakes)]  # cells of every snake, head first
+        self.direction = [0] * n_snakes  # index into DIRECTIONS
+        self.alive = [False] * n_snakes
+        self.grow = [0] * n_snakes  # ticks the tail stays in place
+        self.score = [0] * n_snakes
+        self.apples = set()
+        self.tick = 0
+        self.reset()
+
+    def reset(self, seed: int = None) -> None:
+        """
+        Start a new game in place, the snakes are spread over random free cells
+        :param seed: reseeds the random number generator if given
+        :return: None
+        """
+        if seed is not None:
+            self.random.seed(seed)
+
+        for cell in self.apples:
+            self._add_free(cell)
+        self.apples.clear()
+        for body in self.bodies:
+            while body:
+                self._release(body.pop())
+        for i in range(self.n_snakes):
+            self._spawn(i)
+            self.grow[i] = 0
+            self.score[i] = 0
+
+        for _ in range(self.n_apples):
+            self.place_apple()
+        self.tick = 0
+
+    def _spawn(self, snake: int) -> None:
+        """ Lay the snake straight on free cells, its head pointing away from the body """
+        for _ in range(1000):
+            direction = self.random.randrange(4)
+            dx, dy = DIRECTIONS[direction]
+            x, y = self.random.randrange(self.cols), self.random.randrange(self.rows)
+            cells = [(x - dx * i, y - dy * i) for i in range(self.length)]
+            if all(0 <= cx < self.cols and 0 <= cy < self.rows and self.owner[cx * self.rows + cy] < 0
+                   for cx, cy in cells):
+                break
+        else:
+            raise Exception("No free space to place the snake")
+
+        for cx, cy in cells:
+            self._take(cx * self.rows + cy, snake)
+            self.bodies[snake].append(cx * self.rows + cy)
+        self.direction[snake] = direction
+        self.alive[snake] = True
+
+    def _take(self, cell: int, snake: int) -> None:
+        """ Mark the free cell as covered by the snake """
+        self.owner[cell] = snake
+        self._remove_free(cell)
+
+    def _release(self, cell: int) -> None:
+        """ Mark the cell as free """
+        self.owner[cell] = -1
+        self._add_free(cell)
+
+    def _remove_free(self, cell: int) -> None:
+        """ Drop the cell from the free cells by swapping in the last free one """
+        self.n_free -= 1
+        position = self.free_index[cell]
+        last = self.free[self.n_free]
+        self.free[position] = last
+        self.free_index[last] = position
+        self.free[self.n_free] = cell
+        self.free_index[cell] = self.n_free
+
+    def _add_free(self, cell: int) -> None:
+        """ Append the cell to the free cells """
+        position = self.free_index[cell]
+        first_taken = self.free[self.n_free]
+        self.free[position] = first_taken
+        self.free_index[first_taken] = position
+        self.free[self.n_free] = cell
+        self.free_index[cell] = self.n_free
+        self.n_free += 1
+
+    def place_apple(self) -> None:
+        """ Put an apple on a random free cell in O(1) like Board.random_free_cell, nothing happens if there is none """
+        if self.n_free == 0:
+            return
+        cell = self.free[self.random.randrange(self.n_free)]
+        self._remove_free(cell)
+        self.apples.add(cell)
+
+    def target(self, snake: int, direction: int) -> int:
+        """
+        Cell the head of the snake moves to in the given direction
+        :return: cell, -1 if it lies outside of the board
+        """
+        x, y = divmod(self.bodies[snake][0], self.rows)
+        dx, dy = DIRECTIONS[direction]
+        x, y = x + dx, y + dy
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return x * self.rows + y
+        return -1
+
+    def safe_moves(self, snake: int) -> list[int]:
+        """
+        Directions of the snake whose target cell is on the board and free right now, a cell that is
+        left by a tail in the same tick does not count as free
+        :return: subset of straight, left, right as indices into DIRECTIONS
+        """
+        moves = []
+        for turn in TURNS:
+            direction = (self.direction[snake] + turn) % 4
+            cell = self.target(snake, direction)
+            if cell >= 0 and self.owner[cell] < 0:
+                moves.append(direction)
+        return moves
+
+    def step(self, directions: list[int]) -> list[int]:
+        """
+        Move all living snakes at once
+        :param directions: new direction of every snake as index into DIRECTIONS, ignored for dead snakes
+        :return: snakes that died in this tick
+        """
+        self.tick += 1
+        moving = [i for i in range(self.n_snakes) if self.alive[i]]
+
+        # tails move away first, a head may follow a tail into its cell
+        heads = {}
+        head_count = {}
+        for i in moving:
+            if self.grow[i]:
+                self.grow[i] -= 1
+            else:
+                self._release(self.bodies[i].pop())
+
+            self.direction[i] = directions[i]
+            cell = self.target(i, directions[i])
+            heads[i] = cell
+            head_count[cell] = head_count.get(cell, 0) + 1
+
+        # a head dies on the border, on a body or next to another head, all in one pass over the index
+        owner = self.owner
+        dead = [i for i in moving if heads[i] < 0 or owner[heads[i]] >= 0 or head_count[heads[i]] > 1]
+
+        for i in dead:
+            self.alive[i] = False
+            body = self.bodies[i]
+            while body:
+                self._release(body.pop())
+
+        eaten = 0
+        for i in moving:
+            if not self.alive[i]:
+                continue
+            cell = heads[i]
+            eats = cell in self.apples
+            if eats:
+                # apple cells are not in the free cells, hand it back before the head takes it
+                self.apples.remove(cell)
+                self._add_free(cell)
+            self._take(cell, i)
+            self.bodies[i].appendleft(cell)
+            if eats:
+                self.grow[i] += 1
+                self.score[i] += 1
+                eaten += 1
+
+        for _ in range(eaten):
+            self.place_apple()
+
+        return dead
+
+    def wander(self, rng: random.Random, straight: float = 0.8) -> list[int]:
+        """
+        Directions of simple bots for all snakes, keep going straight if it is safe, otherwise turn
+        to a random safe side
+        :param straight: probability of going straight when other safe moves exist
+        :return: direction of every snake, the current one if there is no safe move or the snake is dead
+        """
+        directions = list(self.direction)
+        for i in range(self.n_snakes):
+            if not self.alive[i]:
+                continue
+            moves = self.safe_moves(i)
+            if not moves:
+                continue
+            if moves[0] == self.direction[i] and (len(moves) == 1 or rng.random() < straight):
+                directions[i] = moves[0]
+            else:
+                directions[i] = rng.choice([move for move in moves if move != self.direction[i]] or moves)
+        return directions
+
+
+if __name__ == '__main__':
+    # time per tick for growing boards and numbers of snakes, the board size should not matter
+    rng = random.Random(0)
+    for cols, rows, n_snakes in ((20, 16, 2), (200, 200, 2), (500, 500, 2), (200, 200, 64), (500, 500, 64),
+                                 (500, 500, 512)):
+        arena = Arena(cols, rows, n_snakes, seed=0)
+        ticks = 0
+        moving = 0.0
+        for episode in range(3):
+            arena.reset(episode)
+            while sum(arena.alive) > 1 and arena.tick < 500:
+                directions = arena.wander(rng)
+                start = time.perf_counter()
+                arena.step(directions)
+                moving += time.perf_counter() - start
+                ticks += 1
+        print(f"{cols}x{rows} board, {n_snakes} snakes: {moving / ticks * 1e6:.1f}us per tick ({ticks} ticks)")
@@ -0,0 +1,343 @@
+import time
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+
+from game import BLOCK_SIZE
+
+# absolute directions, turning left (action 2) moves one index forward, turning right (action 0) one back
+DIRECTIONS = np.array([(1, 0), (0, 1), (-1, 0), (0, -1)])
+TURNS = np.array([3, 0, 1])  # action -> change of the direction index
+CANDIDATE_TURNS = np.array([0, 1, 3])  # straight, left, right
+
+# rewards of SafeSnakeEnv indexed by game_state + 2
+SAFE_REWARDS = np.array([3, -50, 0.1, 50, 0])
+
+
+class BatchSnakeEnv(VecEnv):
+    """
+    N games of SnakeEnv / SafeSnakeEnv held in NumPy arrays and advanced together by one step call.
+    Snake 1 is controlled by the actions, snake 2 is the random biased bot of BotSnake. Observations and
+    rewards are the ones of the single game environments. Finished games are reset automatically, their
+    last observation is returned in info["terminal_observation"] like in the SB3 vector envs.
+
+    Cells are encoded as integers on a board padded by a border of wall cells, so heads that left the
+    playground and the observation window around them can be looked up without bounds checks.
+    Bodies are ring buffers of cell codes with the head at index start.
+    """
+
+    render_mode = None
+
+    def __init__(
+            self,
+            num_envs: int,
+            env_type: str = "snake",
+            grid_size: int = 5,
+            w: int = 600,
+            h: int = 480,
+            seed: int = None,
+            bias: float = 0.7
+    ):
+        assert env_type in ["snake", "safe"], f"Invalid env type: Input - {env_type}, Expected - snake/safe"
+        assert w % BLOCK_SIZE == 0, "Width not divisible by block size"
+        assert h % BLOCK_SIZE == 0, "Height not divisible by block size"
+        assert grid_size % 2 == 1, "The window around the head needs an odd grid size"
+
+        self.env_type = env_type
+        self.grid_size = grid_size
+        self.bias = bias
+        self.cols = w // BLOCK_SIZE
+        self.rows = h // BLOCK_SIZE
+        self.rng = np.random.default_rng(seed)
+
+        # padded board, a head can leave the playground by one cell before the game ends and the window
+        # and the deadly moves are still looked up around it, like the padding of ObservationBuilder
+        half_size = grid_size // 2
+        self.pad = half_size + 2
+        self.ph = self.rows + 2 * self.pad
+        self.n_cells = (self.cols + 2 * self.pad) * self.ph
+        x, y = np.divmod(np.arange(self.n_cells), self.ph)
+        self.cell_x = x - self.pad
+        self.cell_y = y - self.pad
+        self.wall = (self.cell_x < 0) | (self.cell_x >= self.cols) | (self.cell_y < 0) | (self.cell_y >= self.rows)
+        self.dir_offsets = DIRECTIONS[:, 0] * self.ph + DIRECTIONS[:, 1]
+        self.window_offsets = np.array([
+            dx * self.ph + dy
+            for dx in range(-half_size, half_size + 1)
+            for dy in range(-half_size, half_size + 1)
+        ])
+
+        # small reward for being close to the center, precomputed for every cell
+        center_x, center_y = self.cols // 2, self.rows // 2
+        distance_to_center = np.sqrt((center_x - self.cell_x) ** 2 + (center_y - self.cell_y) ** 2)
+        self.center_reward = np.maximum(0, 1 - distance_to_center / max(center_x, center_y)) * 0.1
+
+        # initial bodies of both snakes, same as in Game
+        self.init_bodies = np.array([
+            [self.encode(5 - i, 5) for i in range(5)],
+            [self.encode(12 - i, 12) for i in range(5)],
+        ])
+
+        # state of all games
+        self.capacity = self.cols * self.rows + 2
+        self.body = np.zeros((num_envs, 2, self.capacity), dtype=np.int64)
+        self.start = np.zeros((num_envs, 2), dtype=np.int64)
+        self.length = np.zeros((num_envs, 2), dtype=np.int64)
+        self.direction = np.zeros((num_envs, 2), dtype=np.int64)
+        self.counts = np.zeros((num_envs, 2, self.n_cells), dtype=np.int16)
+        self.apple = np.zeros(num_envs, dtype=np.int64)
+        self.grow = np.zeros((num_envs, 2), dtype=bool)
+        self.game_state = np.zeros(num_envs, dtype=np.int64)
+        self.ai_score = 0
+        self.bot_score = 0
+        self.actions = None
+
+        # distance features of the last observation, shared with the reward
+        self.min_distance_to_opponent = np.zeros(num_envs)
+
+        num_cells = grid_size * grid_size
+        obs_size = num_cells + (8 if env_type == "snake" else 11)
+        observation_space = spaces.Box(low=-1, high=3, shape=(obs_size,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, spaces.Discrete(3))
+
+    def encode(self, x: int, y: int) -> int:
+        """ Cell code of a playground position """
+        return (x + self.pad) * self.ph + y + self.pad
+
+    def heads(self, snake: int) -> np.ndarray:
+        """ Head cell of the given snake in every game """
+        return self.body[np.arange(self.num_envs), snake, self.start[:, snake]]
+
+    def tails(self, snake: int) -> np.ndarray:
+        """ Tail cell of the given snake in every game """
+        tail_pos = (self.start[:, snake] + self.length[:, snake] - 1) % self.capacity
+        return self.body[np.arange(self.num_envs), snake, tail_pos]
+
+    def reset(self) -> np.ndarray:
+        if self._seeds[0] is not None:
+            self.rng = np.random.default_rng(self._seeds[0])
+        self._reset_seeds()
+        self._reset_options()
+
+        self._reset_games(np.arange(self.num_envs))
+        return self._get_observation(np.arange(self.num_envs))
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        games = np.arange(self.num_envs)
+
+        # get new direction for both snakes, the bot decides before any snake moves
+        bot_direction = self._bot_directions()
+        self.direction[:, 0] = (self.direction[:, 0] + TURNS[self.actions]) % 4
+        self.direction[:, 1] = bot_direction
+
+        # move snakes
+        for snake in (0, 1):
+            self._move(snake)
+
+        # check if game over or apple eaten
+        self.game_state = self._collision_states()
+        eaten = np.flatnonzero(np.abs(self.game_state) == 2)
+        if len(eaten):
+            self._place_apples(eaten)
+        self.grow[:, 0] = self.game_state == -2
+        self.grow[:, 1] = self.game_state == 2
+
+        obs = self._get_observation(games)
+        rewards = self._get_rewards()
+        dones = np.abs(self.game_state) == 1
+
+        # Update scores based on game state
+        self.ai_score += int(np.count_nonzero(self.game_state == 1))
+        self.bot_score += int(np.count_nonzero(self.game_state == -1))
+
+        infos = [{} for _ in range(self.num_envs)]
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            for i in finished:
+                infos[i]["terminal_observation"] = obs[i].copy()
+                infos[i]["TimeLimit.truncated"] = False
+            self._reset_games(finished)
+            obs[finished] = self._get_observation(finished)
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def _reset_games(self, games: np.ndarray) -> None:
+        """ Restore the initial state of the given games """
+        init_length = self.init_bodies.shape[1]
+        self.counts[games] = 0
+        self.body[games, :, :init_length] = self.init_bodies
+        self.start[games] = 0
+        self.length[games] = init_length
+        self.direction[games] = 0
+        self.grow[games] = False
+        self.game_state[games] = 0
+        for snake in (0, 1):
+            self.counts[games[:, None], snake, self.init_bodies[snake]] = 1
+        self._place_apples(games)
+
+    def _place_apples(self, games: np.ndarray) -> None:
+        """ Put a new apple on a random free cell of each given game """
+        free = ~self.wall & ~self.counts[games].any(axis=1)
+        if not free.any(axis=1).all():
+            raise Exception("No available positions to place the apple")
+        priority = self.rng.random((len(games), self.n_cells))
+        priority[~free] = -1
+        self.apple[games] = priority.argmax(axis=1)
+
+    def _bot_directions(self) -> np.ndarray:
+        """
+        Random biased direction of the bot snake in every game, see BotSnake.get_random_biased_direction.
+        Of the moves that do not run into the border or into its own body the one closest to the apple is
+        taken with probability bias, the others share the rest. Without a valid move the bot keeps its direction.
+        """
+        games = np.arange(self.num_envs)
+        current = self.direction[:, 1]
+        candidates = (current[:, None] + CANDIDATE_TURNS) % 4
+        new_heads = self.heads(1)[:, None] + self.dir_offsets[candidates]
+
+        # a move is valid if it stays on the playground and does not hit the body, the tail moves away
+        own_segments = self.counts[games[:, None], 1, new_heads] - (new_heads == self.tails(1)[:, None])
+        valid = ~self.wall[new_heads] & (own_segments == 0)
+
+        # squared distance to the apple decides which valid move is preferred
+        apple_distance = ((self.cell_x[new_heads] - self.cell_x[self.apple][:, None]) ** 2
+                          + (self.cell_y[new_heads] - self.cell_y[self.apple][:, None]) ** 2)
+        apple_distance = np.where(valid, apple_distance, np.iinfo(apple_distance.dtype).max)
+        best = apple_distance == apple_distance.min(axis=1, keepdims=True)
+        best &= np.cumsum(best, axis=1) == 1  # first move on ties
+
+        n_others = np.maximum(valid.sum(axis=1, keepdims=True) - 1, 1)
+        weights = np.where(best, self.bias, (1 - self.bias) / n_others) * valid
+        cumulative = np.cumsum(weights, axis=1)
+        target = self.rng.random(self.num_envs) * cumulative[:, -1]
+        choice = np.minimum((cumulative <= target[:, None]).sum(axis=1), 2)
+
+        return np.where(cumulative[:, -1] > 0, candidates[games, choice], current)
+
+    def _move(self, snake: int) -> None:
+        """ Push the new head of the snake in every game and pop its tail unless it grows """
+        games = np.arange(self.num_envs)
+        new_heads = self.heads(snake) + self.dir_offsets[self.direction[:, snake]]
+
+        self.start[:, snake] = (self.start[:, snake] - 1) % self.capacity
+        self.body[games, snake, self.start[:, snake]] = new_heads
+        self.counts[games, snake, new_heads] += 1
+
+        pop = np.flatnonzero(~self.grow[:, snake])
+        tail_pos = (self.start[pop, snake] + self.length[pop, snake]) % self.capacity
+        self.counts[pop, snake, self.body[pop, snake, tail_pos]] -= 1
+        self.length[:, snake] += 1
+        self.length[pop, snake] -= 1
+
+    def _collision_states(self) -> np.ndarray:
+        """ game_state of every game after the move, with the same priorities as Game.is_colliding """
+        games = np.arange(self.num_envs)
+        head_1 = self.heads(0)
+        head_2 = self.heads(1)
+
+        conditions = [
+            self.counts[games, 0, head_1] > 1,  # snake 1 collides with itself
+            self.counts[games, 1, head_2] > 1,  # snake 2 collides with itself
+            self.wall[head_1],  # snake 1 collides with border
+            self.wall[head_2],  # snake 2 collides with border
+            self.counts[games, 1, head_1] > 0,  # snake 1 collides into snake 2
+            self.counts[games, 0, head_2] > 0,  # snake 2 collides into snake 1
+            head_1 == self.apple,  # snake 1 gets the apple
+            head_2 == self.apple,  # snake 2 gets the apple
+        ]
+        return np.select(conditions, [-1, 1, -1, 1, -1, 1, -2, 2], 0)
+
+    def _get_observation(self, games: np.ndarray) -> np.ndarray:
+        """ Observation of snake 1 for the given games, the same features as SnakeEnv / SafeSnakeEnv """
+        rows = games[:, None]
+        heads = self.body[games, 0, self.start[games, 0]]
+        head_x, head_y = self.cell_x[heads], self.cell_y[heads]
+
+        # window around the head
+        cells = heads[:, None] + self.window_offsets
+        window = np.select(
+            [self.counts[rows, 0, cells] > 0, self.counts[rows, 1, cells] > 0,
+             cells == self.apple[rows], self.wall[cells]],
+            [1, 2, 3, -1],
+            0
+        )
+
+        # distance and direction to the apple
+        apple_dx = self.cell_x[self.apple[games]] - head_x
+        apple_dy = self.cell_y[self.apple[games]] - head_y
+        distance_to_apple = np.sqrt(apple_dx ** 2 + apple_dy ** 2)
+
+        # distances to the closest 3 cells of the opponent snake
+        in_body = (np.arange(self.capacity) - self.start[rows, 1]) % self.capacity < self.length[rows, 1]
+        opponent = self.body[games, 1]
+        squared = ((self.cell_x[opponent] - head_x[:, None]) ** 2
+                   + (self.cell_y[opponent] - head_y[:, None]) ** 2).astype(np.float64)
+        squared[~in_body] = np.inf
+        closest = np.sort(np.partition(squared, 2, axis=1)[:, :3], axis=1)
+        distances_to_opponent = np.sqrt(closest)
+        self.min_distance_to_opponent[games] = distances_to_opponent[:, 0]
+
+        features = [
+            window,
+            distance_to_apple[:, None], apple_dx[:, None], apple_dy[:, None],
+            DIRECTIONS[self.direction[games, 0]],
+            distances_to_opponent,
+        ]
+
+        if self.env_type == "safe":
+            candidates = (self.direction[games, 0][:, None] + CANDIDATE_TURNS) % 4
+            new_heads = heads[:, None] + self.dir_offsets[candidates]
+            deadly = self.wall[new_heads] | self.counts[rows, :, new_heads].any(axis=-1)
+            features.append(deadly)
+
+        return np.concatenate(features, axis=1, dtype=np.float32)
+
+    def _get_rewards(self) -> np.ndarray:
+        """ Reward of snake 1 for the current game_state of every game """
+        if self.env_type == "safe":
+            return SAFE_REWARDS[self.game_state + 2]
+
+        # Adjust reward values based on the distance to the opponent snake
+        close = self.min_distance_to_opponent < 3
+        reward_for_0 = np.where(close, 0.5, 0.02) + self.center_reward[self.heads(0)]
+        reward_for_apple = np.where(close, 0.05, 7)
+
+        return np.select(
+            [self.game_state == 2, self.game_state == 1, self.game_state == -1, self.game_state == -2],
+            [0, 50, -50, reward_for_apple],
+            reward_for_0
+        )
+
+    def close(self) -> None:
+        pass
+
+    def get_attr(self, attr_name: str, indices=None) -> list:
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value, indices=None) -> None:
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> list:
+        method = getattr(self, method_name)
+        return [method(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> list:
+        return [False for _ in self._get_indices(indices)]
+
+
+if __name__ == '__main__':
+    env = BatchSnakeEnv(1024, seed=0)
+    env.reset()
+
+    steps = 200
+    start = time.perf_counter()
+    for _ in range(steps):
+        env.step(env.rng.integers(0, 3, env.num_envs))
+    elapsed = time.perf_counter() - start
+
+    print(f"{steps * env.num_envs / elapsed:.0f} env steps per second")
+    print(f"Bot has won {env.bot_score} times")
+    print(f"AI has won {env.ai_score} times")
@@ -0,0 +1,215 @@
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+
+from agent import SnakeEnv
+from safety_agent import SafeSnakeEnv
+from game import Game, BLOCK_SIZE
+
+BOARDS = [(20, 16), (40, 32), (80, 64)]
+LENGTHS = [5, 50, 200]
+# the env workloads run SnakeEnv, the safe_ ones SafeSnakeEnv with the deadly moves, both with the default 5x5 window
+WORKLOADS = ["play_step", "is_colliding", "bot_direction", "env_step", "observation", "safe_env_step", "safe_observation"]
+
+
+def serpentine(x_range: range, y_range: range, length: int) -> list[tuple[int, int]]:
+    """
+    Path of the given length winding row by row through a region of the board
+    :return: list of cells, the last one is the head
+    """
+    path = []
+    for i, y in enumerate(y_range):
+        for x in (x_range if i % 2 == 0 else reversed(x_range)):
+            path.append((x, y))
+            if len(path) == length:
+                return path
+    raise ValueError(f"Snake of length {length} does not fit into the region")
+
+
+def make_game(cols: int, rows: int, length: int, seed: int, snake_1_type: str = "bot") -> Game:
+    """
+    Game on a cols x rows board where both snakes start with the given length, each winding through its
+    own half of the board. Game.reset restores this state, so workloads can replay it.
+    """
+    game = Game(cols * BLOCK_SIZE, rows * BLOCK_SIZE, snake_1_type=snake_1_type, snake_2_type="bot", seed=seed)
+    half = cols // 2
+    regions = [(range(1, half - 1), game.snake_1), (range(half + 1, cols - 1), game.snake_2)]
+    for x_range, snake in regions:
+        path = serpentine(x_range, range(1, rows - 1), length)
+        snake.init_body = tuple(reversed(path))
+        snake.init_direction = (path[-1][0] - path[-2][0], path[-1][1] - path[-2][1])
+    game.reset(seed)
+    return game
+
+
+def make_env(cols: int, rows: int, length: int, seed: int, env_class=SnakeEnv) -> SnakeEnv:
+    """ Headless SnakeEnv or SafeSnakeEnv playing on a game built by make_game, snake 1 is controlled by the actions """
+    env = env_class(show=False, game=make_game(cols, rows, length, seed, snake_1_type="snake"))
+    env.reset(seed=seed)
+    return env
+
+
+def run_workload(name: str, cols: int, rows: int, length: int, calls: int, seed: int) -> np.ndarray:
+    """
+    Time one call of the workload at a time, the game is advanced and reset outside of the timed region
+    :return: latencies of all calls in nanoseconds
+    """
+    rng = np.random.default_rng(seed)
+    latencies = np.empty(calls, dtype=np.int64)
+    clock = time.perf_counter_ns
+
+    if name in ("env_step", "observation", "safe_env_step", "safe_observation"):
+        env = make_env(cols, rows, length, seed, SafeSnakeEnv if name.startswith("safe_") else SnakeEnv)
+        game = env.game
+    else:
+        env = None
+        game = make_game(cols, rows, length, seed)
+
+    def advance():
+        if env is not None:
+            _, _, done, _, _ = env.step(int(rng.integers(3)))
+            if done:
+                env.reset()
+        else:
+            game.play_step()
+            if abs(game.game_state) == 1:
+                game.reset()
+
+    playground = (game.w, game.h, game.block_size)
+    for i in range(calls):
+        if name == "play_step":
+            start = clock()
+            game.play_step()
+            latencies[i] = clock() - start
+            if abs(game.game_state) == 1:
+                game.reset()
+        elif name == "is_colliding":
+            start = clock()
+            game.is_colliding()
+            latencies[i] = clock() - start
+            advance()
+        elif name == "bot_direction":
+            start = clock()
+            game.snake_2.get_random_biased_direction(playground, game.apple)
+            latencies[i] = clock() - start
+            advance()
+        elif name in ("env_step", "safe_env_step"):
+            action = int(rng.integers(3))
+            start = clock()
+            _, _, done, _, _ = env.step(action)
+            latencies[i] = clock() - start
+            if done:
+                env.reset()
+        elif name in ("observation", "safe_observation"):
+            start = clock()
+            env._get_observation()
+            latencies[i] = clock() - start
+            advance()
+        else:
+            raise ValueError(f"Unknown workload: {name}")
+
+    return latencies
+
+
+def summarize(name: str, cols: int, rows: int, length: int, latencies: np.ndarray) -> dict:
+    """ Throughput and latency percentiles of one workload """
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) / 1000
+    return {
+        "name": name,
+        "board": f"{cols}x{rows}",
+        "length": length,
+        "calls": len(latencies),
+        "steps_per_sec": len(latencies) / (latencies.sum() / 1e9),
+        "mean_us": latencies.mean() / 1000,
+        "p50_us": p50,
+        "p90_us": p90,
+        "p99_us": p99,
+    }
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare the throughput of every workload with the stored baseline
+    :param threshold: allowed relative slowdown, e.g. 0.1 for 10%
+    :return: descriptions of all regressions
+    """
+    previous = {(r["name"], r["board"], r["length"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        key = (result["name"], result["board"], result["length"])
+        if key not in previous:
+            continue
+        ratio = result["steps_per_sec"] / previous[key]["steps_per_sec"]
+        result["baseline_ratio"] = ratio
+        if ratio < 1 - threshold:
+            regressions.append(f"{key[0]} {key[1]} length {key[2]}: {ratio:.2f}x of baseline")
+    return regressions
+
+
+def parse_pairs(value: str) -> list[tuple[int, int]]:
+    return [tuple(int(v) for v in pair.split("x")) for pair in value.split(",")]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the simulation and environment hot paths")
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help=f"comma separated subset of {WORKLOADS}")
+    parser.add_argument("--boards", default=",".join(f"{c}x{r}" for c, r in BOARDS), help="board sizes in cells, e.g. 20x16,40x32")
+    parser.add_argument("--lengths", default=",".join(map(str, LENGTHS)), help="initial snake lengths, e.g. 5,50")
+    parser.add_argument("--calls", type=int, default=5000, help="timed calls per workload")
+    parser.add_argument("--seed", type=int, default=0, help="seed of games and actions")
+    parser.add_argument("--output", default=None, help="save the results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="allowed relative slowdown against the baseline")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = []
+
+    for name in args.workloads.split(","):
+        for cols, rows in parse_pairs(args.boards):
+            for length in map(int, args.lengths.split(",")):
+                try:
+                    serpentine(range(1, cols // 2 - 1), range(1, rows - 1), length)
+                except ValueError:
+                    continue  # snake does not fit on this board
+
+                latencies = run_workload(name, cols, rows, length, args.calls, args.seed)
+                result = summarize(name, cols, rows, length, latencies)
+                results.append(result)
+                print(f"{name:16} {result['board']:>6} length {length:4}: {result['steps_per_sec']:10.0f} calls/s"
+                      f"  p50 {result['p50_us']:8.1f}us  p90 {result['p90_us']:8.1f}us  p99 {result['p99_us']:8.1f}us")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.machine(),
+                "calls": args.calls,
+                "seed": args.seed,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import random
+import numpy as np
+
+
+class Board:
+    """
+    Occupancy grid of the playground. For every cell it counts how many segments of each snake lie on it,
+    snakes update it in O(1) whenever their head is pushed or their tail is popped. Collision and apple
+    placement checks are answered from it instead of scanning the snake bodies.
+    Cells outside of the playground are not tracked, a snake whose head left the board is dead anyway.
+
+    The free cells are kept in an array with swap-remove, so a random free cell can be drawn in O(1).
+    Cells are encoded as x * rows + y.
+    """
+
+    def __init__(self, cols: int, rows: int, max_snakes: int = 2):
+        self.cols = cols
+        self.rows = rows
+        self.counts = np.zeros((max_snakes, cols, rows), dtype=np.int16)  # owner, x, y -> number of segments
+        self.snakes = []
+
+        # segments of all snakes per cell code and the set of free cells
+        self.total = [0] * (cols * rows)
+        self.free = list(range(cols * rows))  # the first n_free entries are the free cells
+        self.free_index = list(range(cols * rows))  # cell code -> position in free
+        self.n_free = cols * rows
+
+    def reset(self) -> None:
+        """
+        Clear the board and mark the current bodies of all registered snakes. The free cells are restored
+        to their initial order, so drawing from a reseeded generator gives the same cells again.
+        :return: None
+        """
+        n_cells = self.cols * self.rows
+        self.counts.fill(0)
+        self.total[:] = [0] * n_cells
+        self.free[:] = range(n_cells)
+        self.free_index[:] = range(n_cells)
+        self.n_free = n_cells
+
+        for owner, snake in enumerate(self.snakes):
+            for cell in snake.body:
+                self.add(owner, cell)
+
+    def register(self, snake) -> int:
+        """
+        Add a snake to the board and mark its current body as occupied
+        :param snake: Snake object
+        :return: owner index of the snake on this board
+        """
+        assert len(self.snakes) < self.counts.shape[0], "Board is full, increase max_snakes"
+        owner = len(self.snakes)
+        self.snakes.append(snake)
+        for cell in snake.body:
+            self.add(owner, cell)
+        return owner
+
+    def in_bounds(self, cell: tuple[int, int]) -> bool:
+        """ Check if the cell lies on the playground """
+        return 0 <= cell[0] < self.cols and 0 <= cell[1] < self.rows
+
+    def add(self, owner: int, cell: tuple[int, int]) -> None:
+        """ Mark one segment of the snake as lying on the cell """
+        x, y = cell
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            self.counts[owner, x, y] += 1
+            code = x * self.rows + y
+            self.total[code] += 1
+            if self.total[code] == 1:
+                self._take(code)
+
+    def remove(self, owner: int, cell: tuple[int, int]) -> None:
+        """ Remove one segment of the snake from the cell """
+        x, y = cell
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            self.counts[owner, x, y] -= 1
+            code = x * self.rows + y
+            self.total[code] -= 1
+            if self.total[code] == 0:
+                self._release(code)
+
+    def _take(self, code: int) -> None:
+        """ Remove the cell from the free cells by swapping it with the last free cell """
+        index = self.free_index[code]
+        last = self.free[self.n_free - 1]
+        self.free[index], self.free[self.n_free - 1] = last, code
+        self.free_index[last], self.free_index[code] = index, self.n_free - 1
+        self.n_free -= 1
+
+    def _release(self, code: int) -> None:
+        """ Add the cell to the free cells by swapping it with the first taken cell """
+        index = self.free_index[code]
+        first = self.free[self.n_free]
+        self.free[index], self.free[self.n_free] = first, code
+        self.free_index[first], self.free_index[code] = index, self.n_free
+        self.n_free += 1
+
+    def count(self, owner: int, cell: tuple[int, int]) -> int:
+        """
+        Number of segments of a snake on the cell
+        :return: segment count, 0 for cells outside of the playground
+        """
+        if 0 <= cell[0] < self.cols and 0 <= cell[1] < self.rows:
+            return int(self.counts[owner, cell[0], cell[1]])
+        return 0
+
+    def is_occupied(self, cell: tuple[int, int]) -> bool:
+        """ Check if any snake lies on the cell """
+        if 0 <= cell[0] < self.cols and 0 <= cell[1] < self.rows:
+            return self.total[cell[0] * self.rows + cell[1]] > 0
+        return False
+
+    def free_cells(self) -> np.ndarray:
+        """
+        Cells that are not covered by any snake
+        :return: 1d array of cell codes in no particular order
+        """
+        return np.array(self.free[:self.n_free])
+
+    def random_free_cell(self, rng: random.Random = random) -> tuple[int, int]:
+        """
+        Draw a random cell that is not covered by any snake in O(1)
+        :param rng: random number generator, the random module by default
+        :return: (x, y) of the cell, None if the board is full
+        """
+        if self.n_free == 0:
+            return None
+        return divmod(self.free[rng.randrange(self.n_free)], self.rows)
@@ -0,0 +1,20 @@
+from agent import SnakeEnv
+from safety_agent import SafeSnakeEnv
+
+# environments by the name used on the command line
+ENVS = {
+    "snake": SnakeEnv,
+    "safe": SafeSnakeEnv,
+}
+
+
+def load_ppo(path: str):
+    """
+    Load a PPO checkpoint on the CPU to predict with or to export, not to continue training
+    :param path: checkpoint, e.g. ppo_snake_safe_5.zip
+    :return: PPO model
+    """
+    from stable_baselines3 import PPO  # torch is only loaded when a checkpoint is
+
+    # the schedules are only needed for training and cannot be unpickled across library versions
+    return PPO.load(path, device="cpu", custom_objects={"lr_schedule": 0.0, "clip_range": 0.0})
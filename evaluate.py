@@ -0,0 +1,226 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+
+import numpy as np
+
+from envs import ENVS, load_ppo
+from events import EventType, winner
+from numpy_policy import NumpyPolicy
+
+# number of observation features after the grid_size x grid_size window -> environment
+FEATURES = {
+    8: ("snake", {}),
+    11: ("safe", {}),
+    14: ("safe", {"reachability": True}),
+}
+_models = {}  # checkpoints loaded by this worker process
+
+
+def load_model(path: str):
+    """
+    Load a checkpoint once per process, later calls return the cached model
+    :param path: PPO checkpoint (.zip) or policy exported by export_policy.py (.npz), the latter runs without torch
+    """
+    if path not in _models and path.endswith(".npz"):
+        _models[path] = NumpyPolicy(path)
+    elif path not in _models:
+        _models[path] = load_ppo(path)
+    return _models[path]
+
+
+def detect_env(model, grid_size: int) -> tuple[str, dict]:
+    """
+    Environment a checkpoint was trained on, read from the size of its observation space
+    :return: env type snake/safe and the keyword arguments of the environment
+    """
+    n_features = model.observation_space.shape[0] - grid_size * grid_size
+    if n_features not in FEATURES:
+        raise ValueError(f"Unknown observation size {model.observation_space.shape[0]} for grid size {grid_size}")
+    return FEATURES[n_features]
+
+
+def play_games(
+        path: str,
+        seeds: list[int],
+        grid_size: int = 5,
+        batch_size: int = 64,
+        max_steps: int = 2000,
+        deterministic: bool = False
+) -> list[dict]:
+    """
+    Play headless, seeded games of a checkpoint against the bot. batch_size games run at the same time,
+    their observations are stacked into one predict call per step.
+    :param path: checkpoint, e.g. ppo_snake_6.zip or ppo_snake_6.npz
+    :param seeds: one game per seed
+    :param max_steps: games still running after this many steps count as a draw
+    :param deterministic: take the most likely action instead of sampling it
+    :return: one record per game with seed, result, apples and steps
+    """
+    if not path.endswith(".npz"):
+        import torch
+        torch.set_num_threads(1)  # the games are spread over processes already
+
+    model = load_model(path)
+    env_type, options = detect_env(model, grid_size)
+    if seeds:
+        model.set_random_seed(seeds[0])
+
+    envs = [ENVS[env_type](show=False, grid_size=grid_size, **options) for _ in range(min(batch_size, len(seeds)))]
+    observations = np.zeros((len(envs), *model.observation_space.shape), dtype=np.float32)
+    game_seeds = [None] * len(envs)
+    steps = np.zeros(len(envs), dtype=np.int64)
+    pending = list(reversed(seeds))
+    records = []
+
+    def start(i: int) -> None:
+        game_seeds[i] = pending.pop()
+        observations[i], _ = envs[i].reset(seed=game_seeds[i])
+        steps[i] = 0
+
+    active = []
+    for i in range(len(envs)):
+        start(i)
+        active.append(i)
+
+    while active:
+        actions, _ = model.predict(observations[active], deterministic=deterministic)
+        still_active = []
+        for i, action in zip(active, actions):
+            observations[i], _, done, _, info = envs[i].step(int(action))
+            steps[i] += 1
+            if not done and steps[i] < max_steps:
+                still_active.append(i)
+                continue
+
+            events = info["events"] if done else envs[i].game.events_array()
+            records.append({
+                "seed": game_seeds[i],
+                "winner": winner(events),  # 1 = AI, 2 = bot, 0 = draw
+                "apples_ai": int(np.count_nonzero((events["type"] == EventType.APPLE_EATEN) & (events["snake"] == 1))),
+                "apples_bot": int(np.count_nonzero((events["type"] == EventType.APPLE_EATEN) & (events["snake"] == 2))),
+                "steps": int(steps[i]),
+            })
+            if pending:
+                start(i)
+                still_active.append(i)
+        active = still_active
+
+    return records
+
+
+def wilson_interval(successes: int, n: int, z: float = 1.96) -> tuple[float, float]:
+    """
+    Wilson score interval of a rate
+    :param z: quantile of the normal distribution, 1.96 for 95%
+    :return: lower and upper bound
+    """
+    if n == 0:
+        return 0.0, 1.0
+    rate = successes / n
+    center = (rate + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    margin = z * math.sqrt(rate * (1 - rate) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def summarize(records: list[dict]) -> dict:
+    """ Win, loss and draw rates with 95% intervals, apples per game and the episode length distribution """
+    n = len(records)
+    winners = np.array([record["winner"] for record in records])
+    lengths = np.array([record["steps"] for record in records])
+    summary = {"games": n}
+
+    for name, value in (("win", 1), ("loss", 2), ("draw", 0)):
+        k = int(np.count_nonzero(winners == value))
+        low, high = wilson_interval(k, n)
+        summary[name] = {"count": k, "rate": k / n if n else 0.0, "ci95": [low, high]}
+
+    for key in ("apples_ai", "apples_bot"):
+        apples = np.array([record[key] for record in records])
+        if n:
+            summary[key] = {"mean": float(apples.mean()), "std": float(apples.std()), "max": int(apples.max())}
+        else:
+            summary[key] = {"mean": 0.0, "std": 0.0, "max": 0}
+
+    percentiles = [5, 25, 50, 75, 95]
+    if not n:
+        summary["steps"] = {"mean": 0.0, **{f"p{q}": 0.0 for q in percentiles}, "max": 0}
+        return summary
+    summary["steps"] = {
+        "mean": float(lengths.mean()),
+        **{f"p{q}": float(value) for q, value in zip(percentiles, np.percentile(lengths, percentiles))},
+        "max": int(lengths.max()),
+    }
+    return summary
+
+
+def report(summary: dict) -> str:
+    """ Human readable summary """
+    lines = [f"{summary['games']} games"]
+    for name in ("win", "loss", "draw"):
+        result = summary[name]
+        low, high = result["ci95"]
+        lines.append(f"{name:5} {result['count']:7d}  {result['rate']:6.1%}  95% CI [{low:6.1%}, {high:6.1%}]")
+    for key, label in (("apples_ai", "apples AI"), ("apples_bot", "apples bot")):
+        lines.append(f"{label:11} {summary[key]['mean']:6.2f} per game (std {summary[key]['std']:.2f}, max {summary[key]['max']})")
+    steps = summary["steps"]
+    lines.append(f"steps       mean {steps['mean']:.1f}  p5 {steps['p5']:.0f}  p25 {steps['p25']:.0f}  p50 {steps['p50']:.0f}"
+                 f"  p75 {steps['p75']:.0f}  p95 {steps['p95']:.0f}  max {steps['max']}")
+    return "\n".join(lines)
+
+
+def evaluate(path: str, games: int, workers: int, seed: int = 0, **kwargs) -> list[dict]:
+    """
+    Spread the games over worker processes, every worker plays a contiguous range of seeds
+    :param kwargs: passed to play_games
+    :return: records of all games ordered by seed
+    """
+    seeds = list(range(seed, seed + games))
+    workers = max(1, min(workers, games))
+    if workers == 1:
+        return play_games(path, seeds, **kwargs)
+
+    chunks = [[int(s) for s in chunk] for chunk in np.array_split(seeds, workers)]
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("forkserver")) as pool:
+        futures = [pool.submit(play_games, path, chunk, **kwargs) for chunk in chunks]
+        records = [record for future in futures for record in future.result()]
+    return sorted(records, key=lambda record: record["seed"])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Play many headless games of a checkpoint against the bot")
+    parser.add_argument("model", help="checkpoint, e.g. ppo_snake_6.zip, or its export ppo_snake_6.npz to run without torch")
+    parser.add_argument("--games", type=int, default=2000, help="number of games")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--batch", type=int, default=64, help="games per worker sharing one predict call")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game, game i uses seed + i")
+    parser.add_argument("--max-steps", type=int, default=2000, help="games running longer count as a draw")
+    parser.add_argument("--grid-size", type=int, default=5, help="size of the observation window of the model")
+    parser.add_argument("--deterministic", action="store_true", help="take the most likely action")
+    parser.add_argument("--output", default=None, help="save the summary and all games as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    start = time.perf_counter()
+    records = evaluate(args.model, args.games, args.workers, args.seed, grid_size=args.grid_size,
+                       batch_size=args.batch, max_steps=args.max_steps, deterministic=args.deterministic)
+    elapsed = time.perf_counter() - start
+
+    summary = summarize(records)
+    print(report(summary))
+    print(f"{sum(record['steps'] for record in records) / elapsed:.0f} steps/s in {elapsed:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"model": args.model, "seed": args.seed, "deterministic": args.deterministic,
+                       "summary": summary, "games": records}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
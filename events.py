@@ -0,0 +1,51 @@
+from collections import namedtuple
+from enum import IntEnum
+
+import numpy as np
+
+
+class EventType(IntEnum):
+    APPLE_EATEN = 0
+    SELF_COLLISION = 1  # head runs into the own body
+    BORDER_COLLISION = 2  # head leaves the playground
+    BODY_COLLISION = 3  # head runs into the other snake
+    WINNER = 4  # the game is over, snake is the winner
+
+
+# snake is 1 or 2, tick counts the play_step calls since the last reset
+GameEvent = namedtuple('GameEvent', 'tick, type, snake')
+
+EVENT_DTYPE = np.dtype([("tick", np.int32), ("type", np.int8), ("snake", np.int8)])
+
+MESSAGES = {
+    EventType.APPLE_EATEN: "Snake {snake} gets Apple",
+    EventType.SELF_COLLISION: "Snake {snake} collides with itself",
+    EventType.BORDER_COLLISION: "Snake {snake} collides with border",
+    EventType.BODY_COLLISION: "Snake {snake} collides into Snake {other}",
+    EventType.WINNER: "Winner is Snake {snake}",
+}
+
+
+def events_to_array(events: list[GameEvent]) -> np.ndarray:
+    """
+    Pack events into a structured array with the fields tick, type and snake
+    :return: array of dtype EVENT_DTYPE
+    """
+    return np.array([tuple(event) for event in events], dtype=EVENT_DTYPE)
+
+
+def print_event(event: GameEvent) -> None:
+    """ Subscriber printing the events like the game used to """
+    print(MESSAGES[event.type].format(snake=event.snake, other=3 - event.snake))
+
+
+def winner(events) -> int:
+    """
+    Winner of an episode from its events
+    :param events: list of GameEvent or array of EVENT_DTYPE
+    :return: 1 or 2, 0 if the episode did not end with a winner
+    """
+    for event in reversed(events):
+        if event[1] == EventType.WINNER:
+            return int(event[2])
+    return 0
@@ -0,0 +1,71 @@
+import argparse
+import os
+
+import numpy as np
+
+
+def policy_arrays(model) -> dict:
+    """
+    Weights of the policy network of a PPO model as NumPy arrays, the content of the exported .npz
+    :param model: PPO model with an MlpPolicy
+    :return: dict of arrays, see NumpyPolicy
+    """
+    import torch
+
+    policy = model.policy
+    assert len(model.observation_space.shape) == 1, "Only flat observations are supported"
+
+    arrays = {}
+    activations = set()
+    n_layers = 0
+    for module in policy.mlp_extractor.policy_net:
+        if isinstance(module, torch.nn.Linear):
+            arrays[f"layer_{n_layers}_weight"] = module.weight.detach().cpu().numpy()
+            arrays[f"layer_{n_layers}_bias"] = module.bias.detach().cpu().numpy()
+            n_layers += 1
+        else:
+            activations.add(type(module).__name__)
+    assert len(activations) <= 1, f"Mixed activation functions are not supported: {activations}"
+
+    arrays["n_layers"] = np.array(n_layers)
+    arrays["activation"] = np.array(activations.pop() if activations else "Identity")
+    arrays["action_weight"] = policy.action_net.weight.detach().cpu().numpy()
+    arrays["action_bias"] = policy.action_net.bias.detach().cpu().numpy()
+    arrays["observation_low"] = model.observation_space.low
+    arrays["observation_high"] = model.observation_space.high
+    return arrays
+
+
+def export(path: str, output: str = None) -> str:
+    """
+    Write the policy weights of a PPO checkpoint into a .npz that NumpyPolicy can run without torch
+    :param path: checkpoint, e.g. ppo_snake_safe_5.zip
+    :param output: path of the .npz, next to the checkpoint by default
+    :return: path of the written file
+    """
+    from envs import load_ppo  # the environments are only imported for an export, not by NumpyPolicy users
+
+    model = load_ppo(path)
+    arrays = policy_arrays(model)
+
+    output = output or os.path.splitext(path)[0] + ".npz"
+    np.savez(output, **arrays)
+    return output
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Export the policy of PPO checkpoints for NumpyPolicy")
+    parser.add_argument("models", nargs="+", help="checkpoints, e.g. ppo_snake_6.zip ppo_snake_safe_5.zip")
+    parser.add_argument("--output", default=None, help="path of the .npz, only for a single checkpoint")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    assert args.output is None or len(args.models) == 1, "--output needs a single checkpoint"
+    for path in args.models:
+        print(f"Exported {path} to {export(path, args.output)}")
+
+
+if __name__ == '__main__':
+    main()
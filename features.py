@@ -0,0 +1,88 @@
+import itertools
+import math
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def center_reward_table(cols: int, rows: int) -> np.ndarray:
+    """
+    Small reward of SnakeEnv for being close to the center, precomputed for every cell of a board size
+    :return: read-only array of shape (cols, rows)
+    """
+    center_x, center_y = cols // 2, rows // 2
+    x, y = np.meshgrid(np.arange(cols), np.arange(rows), indexing="ij")
+    distance_to_center = np.sqrt((center_x - x) ** 2 + (center_y - y) ** 2)
+    table = np.maximum(0, 1 - distance_to_center / max(center_x, center_y)) * 0.1
+    table.setflags(write=False)
+    return table
+
+
+# bodies up to this length are measured in plain Python, NumPy only pays off for longer ones
+SHORT_BODY = 64
+
+
+def closest_distances(cells, head_x: int, head_y: int):
+    """
+    Sorted distances from the head to the 3 closest of the given cells
+    :param cells: sequence of at least 3 (x, y) cells, e.g. a snake body
+    :return: list or array of 3 distances
+    """
+    if len(cells) <= SHORT_BODY:
+        squared = sorted([(x - head_x) ** 2 + (y - head_y) ** 2 for x, y in cells])
+        return [math.sqrt(squared[0]), math.sqrt(squared[1]), math.sqrt(squared[2])]
+
+    coordinates = np.fromiter(itertools.chain.from_iterable(cells), dtype=np.int64, count=2 * len(cells))
+    squared = (coordinates[0::2] - head_x) ** 2 + (coordinates[1::2] - head_y) ** 2
+    return np.sqrt(np.sort(np.partition(squared, 2)[:3]))
+
+
+class StepFeatures:
+    """
+    Features of one snake computed once per step after play_step and shared by the observation and the
+    reward of the environments, so the distances to the opponent are not computed twice.
+    """
+
+    def __init__(self, cols: int, rows: int, player: int = 1):
+        """
+        :param player: 1 or 2, the snake the features are computed for
+        """
+        self.cols = cols
+        self.rows = rows
+        self.player = player
+        self.center_rewards = center_reward_table(cols, rows)
+
+        self.head_x = 0
+        self.head_y = 0
+        self.apple_dx = 0
+        self.apple_dy = 0
+        self.apple_distance = 0.0
+        self.opponent_distances = [0.0, 0.0, 0.0]  # sorted distances to the 3 closest cells of the other snake
+        self.min_distance_to_opponent = 0.0
+        self.center_reward = 0.0
+
+    def update(self, game) -> None:
+        """
+        Compute the features for the current state of the game
+        :param game: Game object
+        :return: None
+        """
+        own, other = (game.snake_1, game.snake_2) if self.player == 1 else (game.snake_2, game.snake_1)
+        head_x, head_y = own.body[0]
+        self.head_x, self.head_y = head_x, head_y
+
+        # distance and direction to the apple
+        self.apple_dx = game.apple.x // game.block_size - head_x
+        self.apple_dy = game.apple.y // game.block_size - head_y
+        self.apple_distance = math.sqrt(self.apple_dx ** 2 + self.apple_dy ** 2)
+
+        # distances to the closest cells of the opponent snake
+        self.opponent_distances = closest_distances(other.body, head_x, head_y)
+        self.min_distance_to_opponent = self.opponent_distances[0]
+
+        # a head that left the playground ends the game, the center reward is not used then
+        if 0 <= head_x < self.cols and 0 <= head_y < self.rows:
+            self.center_reward = self.center_rewards[head_x, head_y]
+        else:
+            self.center_reward = 0.0
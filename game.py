@@ -1,19 +1,14 @@
-import pygame
 import random
 from collections import namedtuple
+from board import Board
+from events import EventType, GameEvent, events_to_array, print_event
+from mcts import SearchSnake
 from snake import PlayerSnake, BotSnake, Snake
 
-pygame.init()
-
 Point = namedtuple('Point', 'x, y')
 Scores = namedtuple('Scores', 'player_1_score, player_2_score')
-
-#rgb colors
-WHITE = (255, 255, 255)
-RED = (255, 0, 0)
-BLUE = (0, 0, 255)
-GREEN = (0, 255, 0)
-BLACK = (0, 0, 0)
+# immutable copy of everything that is drawn, see Game.frame and viewer.py
+Frame = namedtuple('Frame', 'episode, tick, bodies, apple')
 
 BLOCK_SIZE = 30
 SNAKE_1 = "bot"
@@ -22,8 +17,21 @@ TICK_SPEED = 5
 
 
 class Game:
-
-    def __init__(self, w=600, h=480, snake_1_type: str = "snake", snake_2_type: str = "bot"):
+    """
+    Pure simulation of the two snake game. The game itself never touches pygame, a Renderer
+    (see renderer.py) can be attached to draw it and to feed keyboard input to a PlayerSnake.
+    The game is silent, apples, collisions and the winner are reported as GameEvents (see events.py).
+    They are collected in events for the current episode and passed to the subscribed callbacks.
+    """
+
+    def __init__(self, w=600, h=480, snake_1_type: str = "snake", snake_2_type: str = "bot", seed: int = None):
+        """
+        :param snake_1_type: snake - moved by the caller (e.g. an environment), bot - random biased bot,
+                             search - lookahead search bot, see mcts.py
+        :param snake_2_type: player - keyboard, bot - random biased bot, search - lookahead search bot,
+                             snake - moved by the caller like snake 1 (e.g. in a tournament)
+        :param seed: seed of the random number generator of the game
+        """
         self.w = w
         self.h = h
         self.block_size = BLOCK_SIZE
@@ -32,142 +40,182 @@ class Game:
 
         assert self.w % BLOCK_SIZE == 0, "Width not divisible by block size"
         assert self.h % BLOCK_SIZE == 0, "Height not divisible by block size"
-        assert snake_1_type in ["snake", "bot"], f"Invalid snake type for player 1: Input - {snake_1_type}, Expected - snake/bot"
-        assert snake_2_type in ["player", "bot"], f"Invalid snake type for player 2: Input - {snake_2_type}, Expected - player/bot"
+        assert snake_1_type in ["snake", "bot", "search"], f"Invalid snake type for player 1: Input - {snake_1_type}, Expected - snake/bot/search"
+        assert snake_2_type in ["player", "bot", "search", "snake"], f"Invalid snake type for player 2: Input - {snake_2_type}, Expected - player/bot/search/snake"
+
+        # all randomness of the game (bots and apples) comes from this generator, see reset
+        self.random = random.Random(seed)
+
+        # occupancy grid of both snakes, used for all collision and apple placement checks
+        self.board = Board(self.w // BLOCK_SIZE, self.h // BLOCK_SIZE)
 
         if snake_1_type == "snake":
-            self.snake_1 = Snake(5, 5, 5, (1, 0))
+            self.snake_1 = Snake(5, 5, 5, (1, 0), self.board)
+        elif snake_1_type == "search":
+            self.snake_1 = SearchSnake(5, 5, 5, (1, 0), self.board, self.random)
+            self.snake_1.game = self
         else:
-            self.snake_1 = BotSnake(5, 5, 5, (1, 0))
+            self.snake_1 = BotSnake(5, 5, 5, (1, 0), self.board, self.random)
 
         if snake_2_type == "bot":
-            self.snake_2 = BotSnake(12, 12, 5, (1, 0))
+            self.snake_2 = BotSnake(12, 12, 5, (1, 0), self.board, self.random)
+        elif snake_2_type == "search":
+            self.snake_2 = SearchSnake(12, 12, 5, (1, 0), self.board, self.random)
+            self.snake_2.game = self
+        elif snake_2_type == "snake":
+            self.snake_2 = Snake(12, 12, 5, (1, 0), self.board)
         else:
-            self.snake_2 = PlayerSnake(12, 12, 5, (1, 0))
-
-        self.display = pygame.display.set_mode((w,h))
-        pygame.display.set_caption('Snake')
-        self.clock = pygame.time.Clock()
+            self.snake_2 = PlayerSnake(12, 12, 5, (1, 0), self.board)
+
+        self.playground_info = (self.w, self.h, BLOCK_SIZE)  # passed to the bots on every step
+        self.renderer = None
+        self.profiler = None  # optional StepProfiler, see profiler.py
+        self.collision = None  # EventType of the collision found by the last is_colliding call
+        self.subscribers = []  # callbacks receiving every GameEvent
+        self.events = []  # GameEvents of the current episode
+        self.tick = 0
+        self.episode = 0  # number of resets, lets a renderer tell a new episode from the next tick
         self.reset()
 
-    def reset(self):
+    def reset(self, seed: int = None) -> None:
+        """
+        Restore the initial game state in place, snakes, board and renderer are reused
+        :param seed: reseeds the random number generator of the game if given
+        :return: None
+        """
+        if seed is not None:
+            self.random.seed(seed)
+
+        if self.profiler is not None:
+            self.profiler.count("resets")
+
         #initialize game state
+        self.snake_1.reset()
+        self.snake_2.reset()
+        self.board.reset()
+        self.game_state = 0
         self.score = Scores(0, 0)
+        self.tick = 0
+        self.episode += 1
+        self.events.clear()
         self.apple = None
         self.place_food()
 
-    def update_ui(self):
-        self.display.fill(BLACK)
-
-        #update snake position
-        self.draw_snakes()
-
-        #update apple position
-        self.draw_apple()
-
-        #update score
-
-        pygame.display.update()
-
-    def draw_snakes(self) -> None:
+    def subscribe(self, callback) -> None:
         """
-        Draw the snakes on the screen
+        Call the callback with every GameEvent from now on, e.g. events.print_event
+        :param callback: function taking a GameEvent
         :return: None
         """
-
-        # Assign colors to snakes
-        snakes = [
-            (self.snake_1, BLUE),
-            (self.snake_2, GREEN),
-        ]
-
-        # iterate over snakes
-        for snake, color in snakes:
-
-            # iterate over snake body
-            for i, point in enumerate(snake.body):
-
-                # Calculate head color to distinguish head from body
-                head_color = (max(color[0] - 150, 0), max(color[1] - 150, 0), max(color[2] - 150, 0))
-
-                # Draw the filled rectangle
-                pygame.draw.rect(self.display, head_color if i == 0 else color,
-                                 pygame.Rect(point[0] * BLOCK_SIZE, point[1] * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE))
-
-                # Draw the outline
-                outline_color = (max(0, color[0] - 100), max(0, color[1] - 100), max(0, color[2] - 100))
-                pygame.draw.rect(self.display, outline_color,
-                                 pygame.Rect(point[0] * BLOCK_SIZE, point[1] * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE), 3)
-
-    def draw_apple(self):
-        """ Draw the food on the screen """
-        pygame.draw.rect(self.display, RED, pygame.Rect(self.apple.x, self.apple.y, BLOCK_SIZE, BLOCK_SIZE))
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback) -> None:
+        self.subscribers.remove(callback)
+
+    def emit(self, event_type: EventType, snake: int) -> None:
+        """ Record an event of the current tick and pass it to all subscribers """
+        event = GameEvent(self.tick, event_type, snake)
+        self.events.append(event)
+        for callback in self.subscribers:
+            callback(event)
+        if self.profiler is not None:
+            self.profiler.count(event_type.name.lower())
+
+    def events_array(self):
+        """ Events of the current episode as structured array, see events.EVENT_DTYPE """
+        return events_to_array(self.events)
+
+    def update_ui(self) -> None:
+        """ Draw the current state with the attached renderer, does nothing when running headless """
+        if self.renderer is not None:
+            self.renderer.update_ui()
+
+    def frame(self) -> Frame:
+        """
+        Immutable snapshot of the drawn state, safe to hand to a renderer on another thread
+        :return: Frame with the bodies of both snakes as tuples of cells and the apple cell
+        """
+        return Frame(self.episode, self.tick, (tuple(self.snake_1.body), tuple(self.snake_2.body)),
+                     (self.apple.x // BLOCK_SIZE, self.apple.y // BLOCK_SIZE))
 
     def place_food(self):
-        all_positions = [Point(x, y) for x in range(0, self.w, BLOCK_SIZE) for y in range(0, self.h, BLOCK_SIZE)]
-        occupied_positions = set(self.snake_1.body) | set(self.snake_2.body)
-        available_positions = [pos for pos in all_positions if pos not in occupied_positions]
+        cell = self.board.random_free_cell(self.random)
 
-        if available_positions:
-            self.apple = random.choice(available_positions)
+        if cell is not None:
+            self.apple = Point(cell[0] * BLOCK_SIZE, cell[1] * BLOCK_SIZE)
         else:
             raise Exception("No available positions to place the apple")
 
     def handle_events(self, player: Snake) -> None:
         """
-        Enables a Player to control the snake using arrow keys
+        Enables a Player to control the snake using arrow keys, input is read by the attached renderer
         :param player: PlayerSnake object
         """
 
-        if not isinstance(player, PlayerSnake):
-            return
-
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                quit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_LEFT and not player.direction == (1, 0):
-                    player.change_direction((-1, 0))
-                elif event.key == pygame.K_RIGHT and not player.direction == (-1, 0):
-                    player.change_direction((1, 0))
-                elif event.key == pygame.K_UP and not player.direction == (0, 1):
-                    player.change_direction((0, -1))
-                elif event.key == pygame.K_DOWN and not player.direction == (0, -1):
-                    player.change_direction((0, 1))
+        if self.renderer is not None:
+            self.renderer.handle_events(player)
 
     def play_step(self):
+        profiler = self.profiler
+        if profiler is not None:
+            t = profiler.start()
+
+        self.tick += 1
 
         # get new direction for snake
         if isinstance(self.snake_1, BotSnake):
-            snake_1_dir = self.snake_1.get_random_biased_direction((self.w, self.h, BLOCK_SIZE), self.apple)
+            snake_1_dir = self.snake_1.get_random_biased_direction(self.playground_info, self.apple)
         else:
             snake_1_dir = self.snake_1.direction
 
         if isinstance(self.snake_2, BotSnake):
-            snake_2_dir = self.snake_2.get_random_biased_direction((self.w, self.h, BLOCK_SIZE), self.apple)
-        else:
+            snake_2_dir = self.snake_2.get_random_biased_direction(self.playground_info, self.apple)
+        elif isinstance(self.snake_2, PlayerSnake):
             self.handle_events(self.snake_2)
             snake_2_dir = self.snake_2.direction
+        else:
+            snake_2_dir = self.snake_2.direction
+
+        if profiler is not None:
+            t = profiler.record("game.directions", t)
 
         # move snake
         self.snake_1.move(snake_1_dir, self.game_state == -2)
         self.snake_2.move(snake_2_dir, self.game_state == 2)
 
+        if profiler is not None:
+            t = profiler.record("game.move", t)
+
         # check if game over
         self.game_state = self.is_colliding()
 
+        if profiler is not None:
+            t = profiler.record("game.collision", t)
+
         # check if apple eaten
         if self.game_state == -2:
-            print(f"Snake 1 gets Apple")
+            self.emit(EventType.APPLE_EATEN, 1)
             self.score = Scores(self.score.player_1_score + 1, self.score.player_2_score)
             self.place_food()
 
         elif self.game_state == 2:
-            print(f"Snake 2 gets Apple")
+            self.emit(EventType.APPLE_EATEN, 2)
             self.score = Scores(self.score.player_1_score, self.score.player_2_score + 1)
             self.place_food()
 
+        # report the collision and the winner
+        elif self.game_state == -1:
+            self.emit(self.collision, 1)
+            self.emit(EventType.WINNER, 2)
+
+        elif self.game_state == 1:
+            self.emit(self.collision, 2)
+            self.emit(EventType.WINNER, 1)
+
+        if profiler is not None:
+            profiler.record("game.food", t)
+            profiler.count("steps")
+
         # return game over, score
         return self.game_state, self.score
 
@@ -186,66 +234,73 @@ class Game:
             -2: Snake of Player 1 gets Apple
         """
 
-        # Get head & new position of snake 1
-        head_1_x, head_1_y = self.snake_1.body[0]
+        self.collision = None
+
+        # Get head & new position of snake 1, the head tuple of the body is reused if the snake does not move
+        head_1 = self.snake_1.body[0]
         if direction_snake_1:
-            head_1_x += direction_snake_1[0]
-            head_1_y += direction_snake_1[1]
+            head_1 = (head_1[0] + direction_snake_1[0], head_1[1] + direction_snake_1[1])
+        head_1_x, head_1_y = head_1
 
         # Get head & new position of snake 2
-        head_2_x, head_2_y = self.snake_2.body[0]
+        head_2 = self.snake_2.body[0]
         if direction_snake_2:
-            head_2_x += direction_snake_2[0]
-            head_2_y += direction_snake_2[1]
+            head_2 = (head_2[0] + direction_snake_2[0], head_2[1] + direction_snake_2[1])
+        head_2_x, head_2_y = head_2
 
         # Check if snake 1 is colliding with itself
         if direction_snake_1 and self.snake_1.is_self_colliding(direction_snake_1):
-                print("Snake 1 collides with itself")
+                self.collision = EventType.SELF_COLLISION
                 return -1
-        elif self.snake_1.body.count((head_1_x, head_1_y)) > 1:
-            print("Snake 1 collides with itself")
+        elif self.board.count(self.snake_1.owner, head_1) > 1:
+            self.collision = EventType.SELF_COLLISION
             return -1
 
         # Check if snake 2 is colliding with itself
         if direction_snake_2 and self.snake_2.is_self_colliding(direction_snake_2):
-            print("Snake 2 collides with itself")
+            self.collision = EventType.SELF_COLLISION
             return 1
-        elif self.snake_2.body.count((head_2_x, head_2_y)) > 1:
-            print("Snake 2 collides with itself")
+        elif self.board.count(self.snake_2.owner, head_2) > 1:
+            self.collision = EventType.SELF_COLLISION
             return 1
 
         # check for collision of snake 1 with the border
         if head_1_x < 0 or head_1_x >= self.w // BLOCK_SIZE or head_1_y < 0 or head_1_y >= self.h // BLOCK_SIZE:
-            print("Snake 1 collides with border")
+            self.collision = EventType.BORDER_COLLISION
             return -1
 
         # check for collision of snake 2 with the border
         if head_2_x < 0 or head_2_x >= self.w // BLOCK_SIZE or head_2_y < 0 or head_2_y >= self.h // BLOCK_SIZE:
-            print("Snake 2 collides with border")
+            self.collision = EventType.BORDER_COLLISION
             return 1
 
         # Check if snake 1 is colliding with snake 2
-        if (head_1_x, head_1_y) in self.snake_2.body:
-            print("Snake 1 collides into Snake 2")
+        if self.board.count(self.snake_2.owner, head_1) > 0:
+            self.collision = EventType.BODY_COLLISION
             return -1
 
         # Check if snake 2 is colliding with snake 1
-        if (head_2_x, head_2_y) in self.snake_1.body:
-            print("Snake 2 collides into Snake 1")
+        if self.board.count(self.snake_1.owner, head_2) > 0:
+            self.collision = EventType.BODY_COLLISION
             return 1
 
         # Check if snake 1 gets the apple
-        if (head_1_x, head_1_y) == (self.apple.x // BLOCK_SIZE, self.apple.y // BLOCK_SIZE):
+        apple_x, apple_y = self.apple.x // BLOCK_SIZE, self.apple.y // BLOCK_SIZE
+        if head_1_x == apple_x and head_1_y == apple_y:
             return -2
 
         # Check if snake 2 gets the apple
-        if (head_2_x, head_2_y) == (self.apple.x // BLOCK_SIZE, self.apple.y // BLOCK_SIZE):
+        if head_2_x == apple_x and head_2_y == apple_y:
             return 2
 
         return 0
 
 if __name__ == '__main__':
+    from renderer import Renderer
+
     game = Game(snake_1_type=SNAKE_1, snake_2_type=SNAKE_2)
+    game.subscribe(print_event)
+    renderer = Renderer(game)
 
     while True:
 
@@ -254,6 +309,6 @@ if __name__ == '__main__':
         elif game.game_state == -1:
             raise Exception("Game Over: Winner is Player 2 (green)")
         else:
-            game.clock.tick(TICK_SPEED)
+            renderer.clock.tick(TICK_SPEED)
             GAME_STATE, score = game.play_step()
             game.update_ui()
\ No newline at end of file
@@ -0,0 +1,226 @@
+import random
+from array import array
+
+# absolute directions, turning left moves one index forward, turning right one index back
+DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+TURNS = (0, 1, 3)  # straight, left, right as change of the direction index
+
+
+class GameState:
+    """
+    Compact copy of a Game for lookahead search. Both snakes are ring buffers of integer cells
+    (x * rows + y, head at start) with a per-cell segment count for each snake, so a state can be
+    stepped without any Snake, Board or pygame object and snapshot / restore only copy flat arrays.
+
+    step follows the rules of Game.play_step: both snakes move, then the collisions are checked in the
+    same order and a snake that ate grows in the following step. Apples are drawn from the given random
+    number generator, so the cells differ from the ones the Game would draw.
+    """
+
+    __slots__ = ("cols", "rows", "capacity", "body", "start", "length", "direction", "occupancy",
+                 "apple", "grow", "game_state", "tick", "random")
+
+    def __init__(self, cols: int, rows: int, seed: int = None):
+        self.cols = cols
+        self.rows = rows
+        self.capacity = cols * rows + 1
+        self.body = [array('i', [0]) * self.capacity for _ in range(2)]
+        self.start = [0, 0]
+        self.length = [0, 0]
+        self.direction = [0, 0]  # index into DIRECTIONS
+        self.occupancy = [bytearray(cols * rows) for _ in range(2)]  # cell -> number of segments of the snake
+        self.apple = -1  # cell of the apple, -1 if the board is full
+        self.grow = [False, False]
+        self.game_state = 0
+        self.tick = 0
+        self.random = random.Random(seed)
+
+    @classmethod
+    def from_game(cls, game) -> "GameState":
+        """
+        Copy snakes, apple, game state and random number generator of a running game
+        :param game: Game that is not over yet
+        :return: new GameState
+        """
+        assert abs(game.game_state) != 1, "Game is over"
+        cols, rows = game.w // game.block_size, game.h // game.block_size
+        state = cls(cols, rows)
+
+        for player, snake in enumerate((game.snake_1, game.snake_2)):
+            body, occupancy = state.body[player], state.occupancy[player]
+            for i, (x, y) in enumerate(snake.body):
+                body[i] = x * rows + y
+                occupancy[x * rows + y] += 1
+            state.length[player] = len(snake.body)
+            state.direction[player] = DIRECTIONS.index(snake.direction)
+
+        state.apple = (game.apple.x // game.block_size) * rows + game.apple.y // game.block_size
+        state.grow[0] = game.game_state == -2
+        state.grow[1] = game.game_state == 2
+        state.game_state = game.game_state
+        state.tick = game.tick
+        state.random.setstate(game.random.getstate())
+        return state
+
+    def snapshot(self) -> tuple:
+        """ Copy of the complete state in O(board), see restore """
+        return (self.body[0][:], self.body[1][:], self.start[:], self.length[:], self.direction[:],
+                bytes(self.occupancy[0]), bytes(self.occupancy[1]), self.apple, self.grow[:],
+                self.game_state, self.tick, self.random.getstate())
+
+    def restore(self, snapshot: tuple) -> None:
+        """
+        Go back to a snapshot of this state in place
+        :param snapshot: return value of snapshot
+        :return: None
+        """
+        (body_1, body_2, start, length, direction, occupancy_1, occupancy_2,
+         self.apple, grow, self.game_state, self.tick, random_state) = snapshot
+        self.body[0][:] = body_1
+        self.body[1][:] = body_2
+        self.start[:] = start
+        self.length[:] = length
+        self.direction[:] = direction
+        self.occupancy[0][:] = occupancy_1
+        self.occupancy[1][:] = occupancy_2
+        self.grow[:] = grow
+        self.random.setstate(random_state)
+
+    def copy(self) -> "GameState":
+        state = GameState(self.cols, self.rows)
+        state.restore(self.snapshot())
+        return state
+
+    def head(self, player: int) -> int:
+        """ Head cell of snake 0 or 1 """
+        return self.body[player][self.start[player]]
+
+    def tail(self, player: int) -> int:
+        return self.body[player][(self.start[player] + self.length[player] - 1) % self.capacity]
+
+    def target(self, player: int, direction: int) -> int:
+        """
+        Cell the head of the snake moves to in the given direction
+        :return: cell, -1 if it lies outside of the playground
+        """
+        x, y = divmod(self.head(player), self.rows)
+        dx, dy = DIRECTIONS[direction]
+        x, y = x + dx, y + dy
+        if 0 <= x < self.cols and 0 <= y < self.rows:
+            return x * self.rows + y
+        return -1
+
+    def legal_moves(self, player: int) -> list[int]:
+        """
+        Directions of the snake that neither leave the playground nor run into the own body
+        :return: subset of straight, left, right as indices into DIRECTIONS
+        """
+        moves = []
+        occupancy = self.occupancy[player]
+        tail = -1 if self.grow[player] else self.tail(player)  # the tail moves away unless the snake grows
+        for turn in TURNS:
+            direction = (self.direction[player] + turn) % 4
+            cell = self.target(player, direction)
+            if cell >= 0 and occupancy[cell] - (cell == tail) == 0:
+                moves.append(direction)
+        return moves
+
+    def biased_move(self, player: int, rng: random.Random, bias: float = 0.7) -> int:
+        """
+        Move of the random biased bot, see BotSnake.get_random_biased_direction
+        :return: index into DIRECTIONS, the current direction if there is no legal move
+        """
+        moves = self.legal_moves(player)
+        if not moves:
+            return self.direction[player]
+        if len(moves) == 1 or self.apple < 0:
+            return moves[0] if len(moves) == 1 else rng.choice(moves)
+
+        apple_x, apple_y = divmod(self.apple, self.rows)
+        head_x, head_y = divmod(self.head(player), self.rows)
+        best = min(moves, key=lambda d: (head_x + DIRECTIONS[d][0] - apple_x) ** 2
+                                        + (head_y + DIRECTIONS[d][1] - apple_y) ** 2)
+        if rng.random() < bias:
+            return best
+        return rng.choice([move for move in moves if move != best])
+
+    def step(self, direction_1: int, direction_2: int, rng: random.Random = None) -> int:
+        """
+        Advance the game by one tick
+        :param direction_1: new direction of snake 1 as index into DIRECTIONS
+        :param direction_2: new direction of snake 2
+        :param rng: generator for the apple, the one of the state by default
+        :return: game state like Game.is_colliding
+        """
+        self.tick += 1
+        head_1 = self._move(0, direction_1)
+        head_2 = self._move(1, direction_2)
+        self.game_state = self._collision_state(head_1, head_2)
+
+        if self.game_state == -2 or self.game_state == 2:
+            self.place_apple(rng if rng is not None else self.random)
+        self.grow[0] = self.game_state == -2
+        self.grow[1] = self.game_state == 2
+        return self.game_state
+
+    def _move(self, player: int, direction: int) -> int:
+        """ Push the new head and pop the tail unless the snake grows, -1 if the head leaves the playground """
+        cell = self.target(player, direction)
+        self.direction[player] = direction
+        if cell < 0:
+            return -1  # the game is over, the body is not updated anymore
+
+        body, occupancy = self.body[player], self.occupancy[player]
+        self.start[player] = (self.start[player] - 1) % self.capacity
+        body[self.start[player]] = cell
+        occupancy[cell] += 1
+
+        if self.grow[player]:
+            self.length[player] += 1
+        else:
+            occupancy[body[(self.start[player] + self.length[player]) % self.capacity]] -= 1
+        return cell
+
+    def _collision_state(self, head_1: int, head_2: int) -> int:
+        """ Same checks and order as Game.is_colliding on the moved snakes """
+        occupancy_1, occupancy_2 = self.occupancy
+
+        # self collisions
+        if head_1 >= 0 and occupancy_1[head_1] > 1:
+            return -1
+        if head_2 >= 0 and occupancy_2[head_2] > 1:
+            return 1
+
+        # border
+        if head_1 < 0:
+            return -1
+        if head_2 < 0:
+            return 1
+
+        # other snake
+        if occupancy_2[head_1]:
+            return -1
+        if occupancy_1[head_2]:
+            return 1
+
+        # apple
+        if head_1 == self.apple:
+            return -2
+        if head_2 == self.apple:
+            return 2
+        return 0
+
+    def place_apple(self, rng: random.Random) -> None:
+        """ Put the apple on a random cell that is not covered by any snake """
+        occupancy_1, occupancy_2 = self.occupancy
+        n_cells = self.cols * self.rows
+
+        # the board is mostly free, a few random tries are cheaper than collecting the free cells
+        for _ in range(16):
+            cell = rng.randrange(n_cells)
+            if not occupancy_1[cell] and not occupancy_2[cell]:
+                self.apple = cell
+                return
+
+        free = [cell for cell in range(n_cells) if not occupancy_1[cell] and not occupancy_2[cell]]
+        self.apple = rng.choice(free) if free else -1
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# modules run as scripts or imported by worker processes
+ENTRY_POINTS = ["game", "agent", "safety_agent", "ai_vs_human", "evaluate", "tournament", "mcts", "arena",
+                "numpy_policy", "export_policy", "envs", "shm_worker", "self_play", "train_parallel"]
+HEAVY = ["numpy", "gymnasium", "pygame", "torch", "stable_baselines3"]
+
+
+def import_times(stderr: str) -> dict:
+    """
+    Cumulative import time of every module, parsed from the output of python -X importtime. A module
+    is only imported once per interpreter, its time includes everything it imported first.
+    :return: module -> milliseconds
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def measure(module: str, repeats: int) -> dict:
+    """
+    Import the module in fresh interpreters like a spawned worker process would
+    :param module: module name, e.g. agent
+    :param repeats: number of interpreters started
+    :return: wall time of the interpreter, import time of the module and of the heavy dependencies it pulled in
+    """
+    env = dict(os.environ, PYGAME_HIDE_SUPPORT_PROMPT="1")
+    code = f"import {module}" if module else "pass"
+    walls = []
+    imports = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True,
+                                env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+        walls.append((time.perf_counter() - start) * 1000)
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        imports.append(import_times(result.stderr))
+
+    last = imports[-1]
+    return {
+        "name": module or "python",
+        "repeats": repeats,
+        "wall_ms": statistics.median(walls),
+        "min_wall_ms": min(walls),
+        "import_ms": statistics.median(times.get(module, 0.0) for times in imports) if module else 0.0,
+        "heavy": {name: last[name] for name in HEAVY if name in last},
+    }
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """
+    Compare the wall time of every entry point with the stored baseline
+    :param threshold: allowed relative slowdown, e.g. 0.2 for 20%
+    :return: descriptions of all regressions
+    """
+    previous = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        if result["name"] not in previous:
+            continue
+        ratio = result["wall_ms"] / previous[result["name"]]["wall_ms"]
+        result["baseline_ratio"] = ratio
+        if ratio > 1 + threshold:
+            regressions.append(f"{result['name']}: {ratio:.2f}x the cold start of the baseline")
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the cold start time of every entry point")
+    parser.add_argument("--modules", default=",".join(ENTRY_POINTS), help="comma separated modules to import")
+    parser.add_argument("--repeats", type=int, default=5, help="fresh interpreters per module")
+    parser.add_argument("--output", default=None, help="save the results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative slowdown against the baseline")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    results = []
+
+    # the interpreter alone, the floor of every cold start
+    for module in [""] + args.modules.split(","):
+        result = measure(module, args.repeats)
+        results.append(result)
+        heavy = ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["heavy"].items()) or "-"
+        print(f"{result['name']:16} wall {result['wall_ms']:7.0f}ms  import {result['import_ms']:7.0f}ms  heavy: {heavy}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "repeats": args.repeats,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+import math
+import random
+import time
+
+from board import Board
+from game_state import DIRECTIONS, GameState
+from snake import BotSnake
+
+# search budget of the SearchSnake in Game
+ITERATIONS = 200
+HORIZON = 30
+
+
+class Node:
+    """ Statistics of one sequence of own moves from the root, the opponent and apples are sampled (open loop) """
+
+    __slots__ = ("visits", "value", "children")
+
+    def __init__(self):
+        self.visits = 0
+        self.value = 0.0
+        self.children = {}  # direction -> Node
+
+
+class MCTSPlanner:
+    """
+    Monte Carlo tree search over the own moves of one snake. Every iteration restores the root state,
+    descends the tree by UCT, adds one node and plays the game on with the random biased bot for both
+    snakes until it is over or the horizon is reached. The opponent always plays the biased bot.
+    The strength scales with the budget, iterations per decision and optionally a time limit.
+    """
+
+    def __init__(
+            self,
+            iterations: int = ITERATIONS,
+            horizon: int = HORIZON,
+            exploration: float = 1.4,
+            bias: float = 0.7,
+            time_limit: float = None,
+            rng: random.Random = None
+    ):
+        """
+        :param iterations: simulated games per decision, at least one is always played
+        :param horizon: maximum number of ticks of a simulated game
+        :param exploration: UCT exploration constant
+        :param bias: probability of the bot moving towards the apple in the simulations
+        :param time_limit: stop searching after this many seconds even if iterations are left, the first
+                           iteration is always played
+        :param rng: random number generator of the simulations
+        """
+        self.iterations = iterations
+        self.horizon = horizon
+        self.exploration = exploration
+        self.bias = bias
+        self.time_limit = time_limit
+        self.rng = rng if rng is not None else random.Random()
+
+    def choose(self, state: GameState, player: int) -> int:
+        """
+        Search the best move of a snake, the state is restored afterwards
+        :param state: current game
+        :param player: 0 for snake 1, 1 for snake 2
+        :return: new direction as index into DIRECTIONS
+        """
+        moves = state.legal_moves(player)
+        if len(moves) <= 1:
+            return moves[0] if moves else state.direction[player]
+
+        root = Node()
+        snapshot = state.snapshot()
+        deadline = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+
+        # at least one iteration, so the root has children to choose from even with no budget left
+        for i in range(max(self.iterations, 1)):
+            if i and deadline is not None and time.perf_counter() > deadline:
+                break
+            self._iterate(state, player, root)
+            state.restore(snapshot)
+
+        return max(root.children.items(), key=lambda item: item[1].visits)[0]
+
+    def _iterate(self, state: GameState, player: int, root: Node) -> None:
+        """ One selection, expansion, simulation and backpropagation """
+        node = root
+        path = [root]
+        depth = 0
+
+        # selection and expansion
+        while state.game_state not in (-1, 1) and depth < self.horizon:
+            moves = state.legal_moves(player) or [state.direction[player]]
+            untried = [move for move in moves if move not in node.children]
+            if untried:
+                move = self.rng.choice(untried)
+                node.children[move] = Node()
+            else:
+                move = self._select(node, moves)
+
+            node = node.children[move]
+            path.append(node)
+            self._step(state, player, move)
+            depth += 1
+            if untried:
+                break
+
+        # simulation
+        while state.game_state not in (-1, 1) and depth < self.horizon:
+            self._step(state, player, state.biased_move(player, self.rng, self.bias))
+            depth += 1
+
+        value = self._evaluate(state, player, depth)
+        for node in path:
+            node.visits += 1
+            node.value += value
+
+    def _select(self, node: Node, moves: list[int]) -> int:
+        """ Child with the highest upper confidence bound """
+        log_visits = math.log(node.visits)
+        best, best_score = None, -math.inf
+        for move in moves:
+            child = node.children[move]
+            score = child.value / child.visits + self.exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = move, score
+        return best
+
+    def _step(self, state: GameState, player: int, move: int) -> None:
+        """ Own move against the biased bot """
+        other = state.biased_move(1 - player, self.rng, self.bias)
+        if player == 0:
+            state.step(move, other, self.rng)
+        else:
+            state.step(other, move, self.rng)
+
+    def _evaluate(self, state: GameState, player: int, depth: int) -> float:
+        """
+        Value of a simulated game for the snake
+        :return: 1 for a win, -1 for a loss, losing later is better, a length difference for unfinished games
+        """
+        sign = 1 if player == 0 else -1
+        if state.game_state in (-1, 1):
+            if state.game_state * sign > 0:
+                return 1.0
+            return -1.0 + 0.5 * depth / self.horizon
+
+        own, other = state.length[player], state.length[1 - player]
+        return 0.5 * (own - other) / (own + other)
+
+
+class SearchSnake(BotSnake):
+    """
+    Snake choosing its moves by MCTSPlanner, stands in for a BotSnake in Game. The game has to be
+    attached to the game attribute, without it the snake falls back to the random biased bot.
+    """
+
+    def __init__(self, init_x: int, init_y: int, init_length: int, init_direction: tuple[int, int] = (-1, 0),
+                 board: Board = None, rng: random.Random = None, planner: MCTSPlanner = None):
+        super().__init__(init_x, init_y, init_length, init_direction, board, rng)
+        self.planner = planner if planner is not None else MCTSPlanner(rng=self.rng)
+        self.game = None
+
+    def get_random_biased_direction(self, playground_info: tuple[int, int, int], apple_location: tuple[int,int]) -> tuple[int, int]:
+        if self.game is None:
+            return super().get_random_biased_direction(playground_info, apple_location)
+
+        state = GameState.from_game(self.game)
+        return DIRECTIONS[self.planner.choose(state, self.owner)]
+
+
+def direction_to_action(direction: tuple[int, int], new_direction: tuple[int, int]) -> int:
+    """
+    Action of SnakeEnv / SafeSnakeEnv that turns the snake into the new direction, lets the planner
+    stand in for the PPO agent
+    :return: 0 = right, 1 = same direction, 2 = left
+    """
+    turn = (DIRECTIONS.index(new_direction) - DIRECTIONS.index(direction)) % 4
+    return {0: 1, 1: 2, 3: 0}[turn]
+
+
+if __name__ == '__main__':
+    from agent import SnakeEnv
+
+    # the planner playing snake 1 of the environment instead of a trained model
+    env = SnakeEnv(show=False)
+    planner = MCTSPlanner(rng=random.Random(0))
+    wins = 0
+    for episode in range(10):
+        env.reset(seed=episode)
+        done = False
+        while not done:
+            game = env.game
+            move = planner.choose(GameState.from_game(game), 0)
+            action = direction_to_action(game.snake_1.direction, DIRECTIONS[move])
+            _, _, done, _, _ = env.step(action)
+        wins += game.game_state == 1
+        print(f"Episode {episode}: {'won' if game.game_state == 1 else 'lost'} after {game.tick} ticks")
+    print(f"Won {wins} of 10 games against the bot")
@@ -0,0 +1,78 @@
+import numpy as np
+
+# activation functions of the policy network by their torch name
+ACTIVATIONS = {
+    "Tanh": np.tanh,
+    "ReLU": lambda x: np.maximum(x, 0),
+    "Identity": lambda x: x,
+}
+
+
+class NumpyPolicy:
+    """
+    Policy of a PPO checkpoint exported by export_policy.py, evaluated with NumPy only. The MLP of the
+    policy (linear layers with activation) and the action net give the logits of the 3 actions.
+    predict has the interface of PPO.predict, deterministic predictions are the argmax of the logits
+    like PPO.predict(deterministic=True), so torch is not needed to play or evaluate a model.
+    """
+
+    def __init__(self, path: str, seed: int = None):
+        """
+        :param path: .npz written by export_policy.py
+        :param seed: seed for sampled (non deterministic) actions
+        """
+        with np.load(path) as data:
+            self._set_arrays(data)
+        self.rng = np.random.default_rng(seed)
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, seed: int = None) -> "NumpyPolicy":
+        """
+        Policy from the arrays of export_policy.policy_arrays without writing a file, e.g. a frozen copy
+        of a model during training
+        """
+        policy = cls.__new__(cls)
+        policy._set_arrays(arrays)
+        policy.rng = np.random.default_rng(seed)
+        return policy
+
+    def _set_arrays(self, data) -> None:
+        from gymnasium import spaces  # only for the observation space of the PPO interface, not needed to import
+        n_layers = int(data["n_layers"])
+        self.layers = [(data[f"layer_{i}_weight"].T.copy(), data[f"layer_{i}_bias"].copy()) for i in range(n_layers)]
+        self.activation = ACTIVATIONS[str(data["activation"])]
+        self.action_weight = data["action_weight"].T.copy()
+        self.action_bias = data["action_bias"].copy()
+        self.observation_space = spaces.Box(data["observation_low"], data["observation_high"], dtype=np.float32)
+
+    def set_random_seed(self, seed: int = None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def logits(self, observations: np.ndarray) -> np.ndarray:
+        """
+        Unnormalized log probabilities of the actions
+        :param observations: array of shape (n, observation size)
+        :return: array of shape (n, 3)
+        """
+        x = observations.astype(np.float32, copy=False)
+        for weight, bias in self.layers:
+            x = self.activation(x @ weight + bias)
+        return x @ self.action_weight + self.action_bias
+
+    def predict(self, observation: np.ndarray, state=None, episode_start=None, deterministic: bool = False):
+        """
+        Actions for one observation or a batch of observations, same interface as PPO.predict
+        :param deterministic: take the most likely action instead of sampling it
+        :return: actions and None for the state
+        """
+        observation = np.asarray(observation)
+        single = observation.ndim == 1
+        logits = self.logits(observation.reshape(1, -1) if single else observation)
+
+        if deterministic:
+            actions = logits.argmax(axis=1)
+        else:
+            # sample with the Gumbel max trick, one uniform draw per action
+            actions = (logits - np.log(-np.log(self.rng.random(logits.shape)))).argmax(axis=1)
+
+        return (actions[0] if single else actions), None
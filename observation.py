@@ -0,0 +1,177 @@
+import numpy as np
+
+from features import StepFeatures
+from reachability import Reachability
+from snake import CANDIDATE_MOVES
+
+# cell values of the observation window
+EMPTY = 0
+OWN_BODY = 1
+OPPONENT_BODY = 2
+APPLE = 3
+WALL = -1
+
+# windows with up to this many cells are looked up cell by cell on the Board, larger ones are sliced out of
+# the padded board filled with NumPy, which has a fixed cost of about 15us on the default board
+LOOKUP_CELLS = 49
+
+
+class ObservationBuilder:
+    """
+    Observation of snake 1 (or snake 2, see player) shared by all environments:
+        - grid_size x grid_size window around the head (see the cell values above)
+        - distance and direction to the apple
+        - direction of the own snake
+        - distances to the 3 closest cells of the other snake
+        - optionally whether going straight, left or right is deadly
+        - optionally the share of the board reachable after going straight, left or right (see reachability.py)
+    Small windows are looked up cell by cell on the Board of the game, large ones are sliced out of a board
+    array padded with walls. All features are written into a preallocated float32 buffer matching the
+    observation space. The distances are taken from step_features,
+    which the environments reuse for the reward.
+    """
+
+    def __init__(self, cols: int, rows: int, grid_size: int = 5, deadly: bool = False, reachability: bool = False,
+                 player: int = 1):
+        """
+        :param player: 1 or 2, the snake observing the game, the other snake is the opponent
+        """
+        self.cols = cols
+        self.rows = rows
+        self.grid_size = grid_size
+        self.deadly = deadly
+        self.player = player
+        self.reachability = Reachability(cols, rows, player) if reachability else None
+
+        # a head can leave the playground by one cell before the game ends, the window reaches around it
+        self.pad = grid_size // 2 + 2
+        self.padded = np.full((cols + 2 * self.pad, rows + 2 * self.pad), WALL, dtype=np.int8)
+        self.interior = self.padded[self.pad:self.pad + cols, self.pad:self.pad + rows]
+
+        num_cells = grid_size * grid_size
+        self.size = num_cells + 8 + (3 if deadly else 0) + (3 if reachability else 0)
+        self.buffer = np.zeros(self.size, dtype=np.float32)
+        self.window = self.buffer[:num_cells].reshape(grid_size, grid_size)
+        self.flat_window = self.buffer[:num_cells]
+        self.features = self.buffer[num_cells:]
+
+        # offsets of the window cells from the head in the order of the flat window
+        half_size = grid_size // 2
+        self.lookup = num_cells <= LOOKUP_CELLS
+        self.offsets = [(dx, dy) for dx in range(-half_size, half_size + 1) for dy in range(-half_size, half_size + 1)]
+
+        # features of the last built observation, see features.py
+        self.step_features = StepFeatures(cols, rows, player)
+
+    def build(self, game, copy: bool = True) -> np.ndarray:
+        """
+        Build the observation for the current state of the game
+        :param game: Game object
+        :param copy: return a copy, otherwise the buffer itself is returned and overwritten by the next call
+        :return: observation as float32 array of length size
+        """
+        own = game.snake_1 if self.player == 1 else game.snake_2
+
+        if self.lookup:
+            self.flat_window[:] = self.window_cells(game)
+        else:
+            self.fill_board(game)
+            head_x, head_y = own.body[0]
+            half_size = self.grid_size // 2
+            x, y = head_x + self.pad, head_y + self.pad
+            self.window[:] = self.padded[x - half_size:x + half_size + 1, y - half_size:y + half_size + 1]
+
+        step_features = self.step_features
+        step_features.update(game)
+        features = self.features
+
+        # distance and direction to the apple
+        features[0] = step_features.apple_distance
+        features[1] = step_features.apple_dx
+        features[2] = step_features.apple_dy
+
+        # direction of the AI snake
+        features[3], features[4] = own.direction
+
+        # distances to the closest 3 cells of the opponent snake
+        features[5:8] = step_features.opponent_distances
+
+        n_features = 8
+        if self.deadly:
+            features[8:11] = self.deadly_moves(game)
+            n_features = 11
+
+        if self.reachability is not None:
+            features[n_features:n_features + 3] = self.reachability.moves(game)
+
+        return self.buffer.copy() if copy else self.buffer
+
+    def window_cells(self, game) -> list[int]:
+        """
+        Cell values of the window around the head read from the Board of the game, the same values
+        fill_board writes into the padded board
+        :return: values of the flat window
+        """
+        board = game.board
+        own, other = (game.snake_1, game.snake_2) if self.player == 1 else (game.snake_2, game.snake_1)
+        cols, rows = self.cols, self.rows
+        total = board.total
+        own_counts = board.counts[own.owner]
+        apple_x, apple_y = game.apple.x // game.block_size, game.apple.y // game.block_size
+        head = own.body[0]
+        other_head = other.body[0]
+        head_x, head_y = head
+
+        values = []
+        for dx, dy in self.offsets:
+            x, y = head_x + dx, head_y + dy
+            if 0 <= x < cols and 0 <= y < rows:
+                if total[x * rows + y]:
+                    values.append(OWN_BODY if own_counts[x, y] else OPPONENT_BODY)
+                elif x == apple_x and y == apple_y:
+                    values.append(APPLE)
+                else:
+                    values.append(EMPTY)
+            elif (x, y) == head:  # heads that left the playground are still shown
+                values.append(OWN_BODY)
+            elif (x, y) == other_head:
+                values.append(OPPONENT_BODY)
+            else:
+                values.append(WALL)
+        return values
+
+    def fill_board(self, game) -> None:
+        """ Write the cell values of the whole playground into the padded board """
+        board = game.board
+        own, other = (game.snake_1, game.snake_2) if self.player == 1 else (game.snake_2, game.snake_1)
+        interior = self.interior
+        interior.fill(EMPTY)
+        interior[game.apple.x // game.block_size, game.apple.y // game.block_size] = APPLE
+        interior[board.counts[other.owner] > 0] = OPPONENT_BODY
+        interior[board.counts[own.owner] > 0] = OWN_BODY
+
+        # heads that left the playground are not on the board, the walls around it are reset every time
+        self.padded[:self.pad] = WALL
+        self.padded[-self.pad:] = WALL
+        self.padded[:, :self.pad] = WALL
+        self.padded[:, -self.pad:] = WALL
+        for snake, value in ((other, OPPONENT_BODY), (own, OWN_BODY)):
+            head_x, head_y = snake.body[0]
+            if not board.in_bounds((head_x, head_y)) and -self.pad <= head_x < self.cols + self.pad \
+                    and -self.pad <= head_y < self.rows + self.pad:
+                self.padded[head_x + self.pad, head_y + self.pad] = value
+
+    def deadly_moves(self, game) -> list[float]:
+        """
+        Whether going straight, left or right runs into a wall or a snake, read from the Board of the game
+        :return: list of 3 values, 1 for deadly
+        """
+        own = game.snake_1 if self.player == 1 else game.snake_2
+        cols, rows = self.cols, self.rows
+        total = game.board.total
+        head_x, head_y = own.body[0]
+        deadly = []
+        for dx, dy in CANDIDATE_MOVES[own.direction]:
+            x, y = head_x + dx, head_y + dy
+            deadly.append(0.0 if 0 <= x < cols and 0 <= y < rows and not total[x * rows + y] else 1.0)
+        return deadly
@@ -0,0 +1,149 @@
+import csv
+import json
+import time
+from collections import Counter
+
+N_BUCKETS = 48  # bucket i holds durations of i bits in nanoseconds, 2^47 ns is about 39 hours
+
+
+class PhaseStats:
+    """ Wall-time histogram of one phase with power of two buckets in nanoseconds """
+
+    __slots__ = ("calls", "total_ns", "min_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, duration_ns: int) -> None:
+        self.calls += 1
+        self.total_ns += duration_ns
+        if self.min_ns is None or duration_ns < self.min_ns:
+            self.min_ns = duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+        self.buckets[min(duration_ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def merge(self, other: "PhaseStats") -> None:
+        self.calls += other.calls
+        self.total_ns += other.total_ns
+        if other.min_ns is not None and (self.min_ns is None or other.min_ns < self.min_ns):
+            self.min_ns = other.min_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile from the histogram, the upper bound of the bucket is returned
+        :param q: percentile from 0 to 100
+        :return: duration in nanoseconds
+        """
+        target = self.calls * q / 100
+        seen = 0
+        for bits, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(float(2 ** bits), float(self.max_ns))
+        return float(self.max_ns)
+
+
+class StepProfiler:
+    """
+    Opt-in instrumentation of Game and the environments. Records wall-time histograms per phase and event
+    counters (steps, resets, apples, collisions by kind, ...). Objects only measure when a profiler is
+    attached to their profiler attribute, without one the cost is a single None check per phase.
+
+    Usage inside a hot path:
+        if profiler is not None: t = profiler.start()
+        ... phase ...
+        if profiler is not None: t = profiler.record("phase", t)
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.counters = Counter()
+        self.clock = time.perf_counter_ns
+
+    def start(self) -> int:
+        """ Current time in nanoseconds, the start of the next phase """
+        return self.clock()
+
+    def record(self, phase: str, start_ns: int) -> int:
+        """
+        Add the time since start_ns to the histogram of the phase
+        :return: current time, the start of the following phase
+        """
+        now = self.clock()
+        stats = self.phases.get(phase)
+        if stats is None:
+            stats = self.phases[phase] = PhaseStats()
+        stats.add(now - start_ns)
+        return now
+
+    def count(self, name: str, n: int = 1) -> None:
+        """ Increase an event counter """
+        self.counters[name] += n
+
+    def merge(self, other: "StepProfiler") -> None:
+        """ Add the measurements of another profiler, e.g. from a worker process """
+        for phase, stats in other.phases.items():
+            self.phases.setdefault(phase, PhaseStats()).merge(stats)
+        self.counters.update(other.counters)
+
+    def reset(self) -> None:
+        self.phases.clear()
+        self.counters.clear()
+
+    def summary(self) -> dict:
+        """ Phase statistics in microseconds and the counters """
+        phases = {}
+        for phase, stats in sorted(self.phases.items()):
+            phases[phase] = {
+                "calls": stats.calls,
+                "total_ms": stats.total_ns / 1e6,
+                "mean_us": stats.total_ns / stats.calls / 1000,
+                "min_us": stats.min_ns / 1000,
+                "p50_us": stats.percentile(50) / 1000,
+                "p90_us": stats.percentile(90) / 1000,
+                "p99_us": stats.percentile(99) / 1000,
+                "max_us": stats.max_ns / 1000,
+                "histogram_ns": {2 ** bits: count for bits, count in enumerate(stats.buckets) if count},
+            }
+        return {"phases": phases, "counters": dict(self.counters)}
+
+    def dump_json(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def dump_csv(self, path: str) -> None:
+        """ One row per phase and one per counter """
+        summary = self.summary()
+        columns = ["calls", "total_ms", "mean_us", "min_us", "p50_us", "p90_us", "p99_us", "max_us"]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name", *columns])
+            for phase, stats in summary["phases"].items():
+                writer.writerow(["phase", phase, *(stats[column] for column in columns)])
+            for counter, value in sorted(summary["counters"].items()):
+                writer.writerow(["counter", counter, value] + [""] * (len(columns) - 1))
+
+    def dump(self, path: str) -> None:
+        """ Write the summary as CSV or JSON depending on the file extension """
+        if path.endswith(".csv"):
+            self.dump_csv(path)
+        else:
+            self.dump_json(path)
+
+    def report(self) -> str:
+        """ Human readable table of all phases and counters """
+        summary = self.summary()
+        lines = [f"{'phase':24} {'calls':>9} {'total ms':>10} {'mean us':>9} {'p50 us':>9} {'p99 us':>9}"]
+        for phase, stats in summary["phases"].items():
+            lines.append(f"{phase:24} {stats['calls']:9d} {stats['total_ms']:10.1f} {stats['mean_us']:9.1f}"
+                         f" {stats['p50_us']:9.1f} {stats['p99_us']:9.1f}")
+        for counter, value in sorted(summary["counters"].items()):
+            lines.append(f"{counter:24} {value:9d}")
+        return "\n".join(lines)
@@ -0,0 +1,88 @@
+import numpy as np
+
+
+class Reachability:
+    """
+    Number of free cells a snake can reach after going straight, left or right, computed by a flood fill
+    on a bitboard. The playground is packed into one Python integer with bit x * (rows + 1) + y per cell,
+    the extra bit per column stays empty so shifting by one never wraps into the next column.
+    A flood fill step is a handful of shifts and ands on this integer instead of a loop over cells.
+
+    The tail of the snake counts as free since it moves away in the next step unless the snake grows,
+    all other snake cells block.
+    """
+
+    def __init__(self, cols: int, rows: int, player: int = 1):
+        """
+        :param player: 1 or 2, the snake the reachable area is computed for
+        """
+        self.cols = cols
+        self.rows = rows
+        self.player = player
+        self.stride = rows + 1
+        self.n_cells = cols * rows
+
+        # occupancy with the empty guard row, packed little endian into the bitboard
+        self.occupied = np.zeros((cols, self.stride), dtype=bool)
+        self.playground = (1 << (cols * self.stride)) - 1
+        for x in range(cols):
+            self.playground &= ~(1 << (x * self.stride + rows))
+
+    def free_cells(self, game) -> int:
+        """ Bitboard of all cells that are not covered by a snake, the moving tail of the own snake included """
+        occupied = self.occupied
+        np.any(game.board.counts, axis=0, out=occupied[:, :self.rows])
+        occupied_bits = int.from_bytes(np.packbits(occupied, bitorder="little").tobytes(), "little")
+
+        snake, grows = (game.snake_1, game.game_state == -2) if self.player == 1 else (game.snake_2, game.game_state == 2)
+        tail_x, tail_y = snake.body[-1]
+        if not grows and game.board.in_bounds((tail_x, tail_y)):  # after an apple the tail stays
+            occupied_bits &= ~(1 << (tail_x * self.stride + tail_y))
+        return self.playground & ~occupied_bits
+
+    def flood_fill(self, start: int, free: int) -> int:
+        """
+        All cells connected to the start cells through free cells
+        :param start: bitboard of the start cells, they have to be free
+        :param free: bitboard of the free cells
+        :return: bitboard of the reachable cells
+        """
+        stride = self.stride
+        reached = start
+        while True:
+            grown = (reached | reached << 1 | reached >> 1 | reached << stride | reached >> stride) & free
+            if grown == reached:
+                return reached
+            reached = grown
+
+    def moves(self, game) -> np.ndarray:
+        """
+        Reachable free cells after going straight, left or right, divided by the number of cells
+        :param game: Game object
+        :return: array of 3 values from 0 to 1, 0 if the move is deadly right away
+        """
+        free = self.free_cells(game)
+        snake = game.snake_1 if self.player == 1 else game.snake_2
+        direction_x, direction_y = snake.direction
+        head_x, head_y = snake.body[0]
+        areas = np.zeros(3, dtype=np.float32)
+        regions = []  # flood fills of the previous moves, neighbouring moves often share their region
+
+        for i, (dx, dy) in enumerate(((direction_x, direction_y), (-direction_y, direction_x), (direction_y, -direction_x))):
+            x, y = head_x + dx, head_y + dy
+            if not (0 <= x < self.cols and 0 <= y < self.rows):
+                continue
+            cell = 1 << (x * self.stride + y)
+            if not cell & free:
+                continue
+
+            for region, area in regions:
+                if cell & region:
+                    break
+            else:
+                region = self.flood_fill(cell, free)
+                area = region.bit_count() / self.n_cells
+                regions.append((region, area))
+            areas[i] = area
+
+        return areas
@@ -0,0 +1,188 @@
+import pygame
+from snake import PlayerSnake, Snake
+
+#rgb colors
+WHITE = (255, 255, 255)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+GREEN = (0, 255, 0)
+BLACK = (0, 0, 0)
+
+
+class Renderer:
+    """
+    Optional pygame front end for a Game. Opens the window, draws the game state and reads the
+    keyboard for a PlayerSnake. Only create one when the game should actually be shown.
+
+    The renderer draws Frames, immutable snapshots of the game (see Game.frame). Between two frames of
+    the same episode only a few cells change: the moved heads, the vacated tails and the old and new
+    apple. draw only blits the cells that differ from the last frame from pre-rendered cell surfaces
+    and updates their rects on the screen. The whole screen is redrawn on a new episode.
+    """
+
+    def __init__(self, game, attach: bool = True):
+        """
+        :param game: Game object, sets the window size
+        :param attach: draw the game on its update_ui calls and read the keyboard for it, without
+                       attaching the frames are passed to draw, e.g. by a Viewer
+        """
+        pygame.init()
+        self.game = None
+        self.display = pygame.display.set_mode((game.w, game.h))
+        pygame.display.set_caption('Snake')
+        self.clock = pygame.time.Clock()
+        self.block_size = game.block_size
+        self.cells = self.render_cells(game.block_size)
+
+        # last drawn frame and the cells of its snakes, None forces a full redraw
+        self.frame = None
+        self.occupied = ()
+
+        if attach:
+            self.attach(game)
+
+    def attach(self, game) -> None:
+        """
+        Draw the given game from now on, the window is reused
+        :param game: Game object
+        :return: None
+        """
+        if self.game is not None and self.game is not game:
+            self.game.renderer = None
+
+        if self.display.get_size() != (game.w, game.h):
+            self.display = pygame.display.set_mode((game.w, game.h))
+
+        if self.block_size != game.block_size:
+            self.block_size = game.block_size
+            self.cells = self.render_cells(game.block_size)
+
+        self.game = game
+        game.renderer = self
+        self.frame = None
+
+    @staticmethod
+    def render_cells(block_size: int) -> dict:
+        """
+        Pre-render the surface of every kind of cell once
+        :return: kind -> surface of block_size x block_size
+        """
+        cells = {}
+        for name, color in (("snake_1", BLUE), ("snake_2", GREEN)):
+            # the head is darker than the body, both have a dark outline
+            head_color = (max(color[0] - 150, 0), max(color[1] - 150, 0), max(color[2] - 150, 0))
+            outline_color = (max(0, color[0] - 100), max(0, color[1] - 100), max(0, color[2] - 100))
+            for kind, fill in (("head", head_color), ("body", color)):
+                surface = pygame.Surface((block_size, block_size))
+                surface.fill(fill)
+                pygame.draw.rect(surface, outline_color, surface.get_rect(), 3)
+                cells[f"{name}_{kind}"] = surface
+
+        cells["apple"] = pygame.Surface((block_size, block_size))
+        cells["apple"].fill(RED)
+        cells["background"] = pygame.Surface((block_size, block_size))
+        cells["background"].fill(BLACK)
+        return cells
+
+    def update_ui(self):
+        """ Draw the current state of the attached game """
+        self.draw(self.game.frame())
+
+    def draw(self, frame) -> None:
+        """
+        Show a frame, only the cells that changed since the last frame of the same episode are redrawn
+        :param frame: Frame object, see Game.frame
+        :return: None
+        """
+        last = self.frame
+        if last is not None and last.episode == frame.episode and last.tick == frame.tick:
+            # nothing moved since the last frame
+            return
+
+        occupied = tuple(frozenset(body) for body in frame.bodies)
+
+        if last is not None and last.episode == frame.episode:
+            # cells entered or left by a snake, the old and new heads and apples
+            dirty = {last.apple, frame.apple}
+            for old_cells, new_cells, old_body, new_body in zip(self.occupied, occupied, last.bodies, frame.bodies):
+                dirty |= old_cells ^ new_cells
+                dirty.add(old_body[0])
+                dirty.add(new_body[0])
+
+            cols, rows = self.display.get_width() // self.block_size, self.display.get_height() // self.block_size
+            rects = [self.draw_cell(cell, frame, occupied) for cell in dirty
+                     if 0 <= cell[0] < cols and 0 <= cell[1] < rows]
+            pygame.display.update(rects)
+        else:
+            self.display.fill(BLACK)
+
+            #update snake position
+            self.draw_snakes(frame)
+
+            #update apple position
+            self.draw_apple(frame)
+
+            pygame.display.update()
+
+        self.frame = frame
+        self.occupied = occupied
+
+    def draw_cell(self, cell: tuple[int, int], frame, occupied: tuple) -> pygame.Rect:
+        """
+        Redraw a single cell, the apple is drawn over snake 2 and snake 2 over snake 1 like on a full redraw
+        :param cell: (x, y) on the playground
+        :param occupied: cells of both snakes as sets
+        :return: rect of the cell on the screen
+        """
+        if cell == frame.apple:
+            surface = self.cells["apple"]
+        elif cell in occupied[1]:
+            surface = self.cells["snake_2_head" if frame.bodies[1][0] == cell else "snake_2_body"]
+        elif cell in occupied[0]:
+            surface = self.cells["snake_1_head" if frame.bodies[0][0] == cell else "snake_1_body"]
+        else:
+            surface = self.cells["background"]
+
+        return self.display.blit(surface, (cell[0] * self.block_size, cell[1] * self.block_size))
+
+    def draw_snakes(self, frame) -> None:
+        """
+        Draw the snakes on the screen
+        :return: None
+        """
+
+        block_size = self.block_size
+
+        # iterate over snakes, the whole body is drawn head first, then the head again on top of it
+        for body, name in zip(frame.bodies, ("snake_1", "snake_2")):
+            self.display.blits([(self.cells[f"{name}_body"], (x * block_size, y * block_size)) for x, y in body], False)
+
+            head_x, head_y = body[0]
+            self.display.blit(self.cells[f"{name}_head"], (head_x * block_size, head_y * block_size))
+
+    def draw_apple(self, frame):
+        """ Draw the food on the screen """
+        self.display.blit(self.cells["apple"], (frame.apple[0] * self.block_size, frame.apple[1] * self.block_size))
+
+    def handle_events(self, player: Snake) -> None:
+        """
+        Enables a Player to control the snake using arrow keys
+        :param player: PlayerSnake object
+        """
+
+        if not isinstance(player, PlayerSnake):
+            return
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                quit()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_LEFT and not player.direction == (1, 0):
+                    player.change_direction((-1, 0))
+                elif event.key == pygame.K_RIGHT and not player.direction == (-1, 0):
+                    player.change_direction((1, 0))
+                elif event.key == pygame.K_UP and not player.direction == (0, 1):
+                    player.change_direction((0, -1))
+                elif event.key == pygame.K_DOWN and not player.direction == (0, -1):
+                    player.change_direction((0, 1))
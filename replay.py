@@ -0,0 +1,341 @@
+import argparse
+import struct
+import time
+import zlib
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+from game import BLOCK_SIZE, Game
+from game_state import DIRECTIONS
+from mcts import ITERATIONS, SearchSnake
+from snake import BotSnake
+
+# file layout of one episode, little endian: magic, format version, snake types, compressed, board size,
+# seed, ticks, checksum interval, last game state, number of checksums, size of the packed directions
+HEADER = struct.Struct("<4sBBBBHHQIHbII")
+MAGIC = b"SNKR"
+VERSION = 1
+
+# how the snakes are replayed: directions from the file, or recomputed by the bot / search from the game's rng
+SNAKE_TYPES = ("snake", "bot", "search")
+
+CHECKSUM_EVERY = 64
+
+Episode = namedtuple('Episode', 'seed, snake_types, cols, rows, ticks, checksum_every, game_state, checksums, directions')
+
+
+def state_checksum(game: Game) -> int:
+    """ crc32 of everything that decides the further course of the game: tick, game state, apple, bodies, directions """
+    rows = game.board.rows
+    cells = array('i', (game.tick, game.game_state, (game.apple.x // BLOCK_SIZE) * rows + game.apple.y // BLOCK_SIZE))
+    for snake in (game.snake_1, game.snake_2):
+        cells.append(len(snake.body))
+        cells.append(DIRECTIONS.index(snake.direction))
+        cells.extend(x * rows + y for x, y in snake.body)
+    return zlib.crc32(cells.tobytes())
+
+
+def snake_type(snake) -> str:
+    """ Replay type of a snake of a running game """
+    if isinstance(snake, SearchSnake):
+        assert snake.planner.iterations == ITERATIONS and snake.planner.time_limit is None, \
+            "Only search snakes with the default, deterministic planner can be replayed"
+        return "search"
+    if isinstance(snake, BotSnake):
+        return "bot"
+    return "snake"
+
+
+def pack(values: bytearray) -> bytes:
+    """ Pack 2 bit values, 4 per byte """
+    padded = np.zeros(-(-len(values) // 4) * 4, dtype=np.uint8)
+    padded[:len(values)] = np.frombuffer(values, dtype=np.uint8)
+    quads = padded.reshape(-1, 4)
+    return (quads[:, 0] | quads[:, 1] << 2 | quads[:, 2] << 4 | quads[:, 3] << 6).astype(np.uint8).tobytes()
+
+
+def unpack(data: bytes, n: int) -> np.ndarray:
+    """ Inverse of pack for n values """
+    packed = np.frombuffer(data, dtype=np.uint8)
+    return (packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8) & 3).reshape(-1)[:n]
+
+
+class Recorder:
+    """
+    Records an episode of a Game as its seed and the directions of the snakes moved by the caller,
+    2 bits per snake and tick. Bots and search snakes are not stored, they are recomputed on replay from
+    the seeded random number generator of the game. Every checksum_every ticks a checksum of the state
+    is stored, so a replay detects where it diverged.
+
+    Call begin right after the game was reset with a seed, record after every play_step (or env.step)
+    and end when the episode is over.
+    """
+
+    def __init__(self, game: Game, checksum_every: int = CHECKSUM_EVERY):
+        """
+        :param checksum_every: ticks between two state checksums, 0 only stores the checksum of the last tick
+        """
+        self.game = game
+        self.checksum_every = checksum_every
+        self.seed = None
+        self.types = None
+        self.external = []
+        self.directions = bytearray()
+        self.checksums = []
+
+    def begin(self, seed: int) -> None:
+        """
+        Start recording a new episode
+        :param seed: seed the game was just reset with, 0 <= seed < 2 ** 64
+        :return: None
+        """
+        game = self.game
+        assert game.tick == 0, "Reset the game with the seed before recording"
+        assert 0 <= seed < 2 ** 64, "Seeds are stored as unsigned 64 bit integers"
+        self.seed = seed
+        self.types = tuple(snake_type(snake) for snake in (game.snake_1, game.snake_2))
+        self.external = [snake for snake, kind in zip((game.snake_1, game.snake_2), self.types) if kind == "snake"]
+        self.directions = bytearray()
+        self.checksums = []
+
+    def record(self) -> None:
+        """ Store the moves of the last tick """
+        for snake in self.external:
+            self.directions.append(DIRECTIONS.index(snake.direction))
+        if self.checksum_every and self.game.tick % self.checksum_every == 0:
+            self.checksums.append(state_checksum(self.game))
+
+    def end(self) -> Episode:
+        """ The recorded episode, the checksum of the last tick is always stored """
+        game = self.game
+        assert len(self.directions) == game.tick * len(self.external), "record was not called after every tick"
+        checksums = self.checksums
+        if not self.checksum_every or game.tick % self.checksum_every:
+            checksums = checksums + [state_checksum(game)]
+        return Episode(self.seed, self.types, game.board.cols, game.board.rows, game.tick, self.checksum_every,
+                       game.game_state, tuple(checksums), pack(self.directions))
+
+
+def to_bytes(episode: Episode, compress: bool = True) -> bytes:
+    """
+    Binary form of an episode, episodes written one after the other form an archive
+    :param compress: zlib compress the directions, snakes mostly go straight
+    """
+    directions = zlib.compress(episode.directions, 9) if compress else episode.directions
+    header = HEADER.pack(MAGIC, VERSION, SNAKE_TYPES.index(episode.snake_types[0]),
+                         SNAKE_TYPES.index(episode.snake_types[1]), compress, episode.cols, episode.rows, episode.seed,
+                         episode.ticks, episode.checksum_every, episode.game_state, len(episode.checksums),
+                         len(directions))
+    return header + struct.pack(f"<{len(episode.checksums)}I", *episode.checksums) + directions
+
+
+def from_bytes(data, offset: int = 0) -> tuple[Episode, int]:
+    """
+    Read one episode
+    :param offset: position of the episode in data
+    :return: episode and the offset of the next one
+    """
+    (magic, version, type_1, type_2, compressed, cols, rows, seed, ticks, checksum_every, game_state,
+     n_checksums, size) = HEADER.unpack_from(data, offset)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"No episode of format version {VERSION} at offset {offset}")
+
+    offset += HEADER.size
+    checksums = struct.unpack_from(f"<{n_checksums}I", data, offset)
+    offset += 4 * n_checksums
+    directions = bytes(data[offset:offset + size])
+    if compressed:
+        directions = zlib.decompress(directions)
+
+    episode = Episode(seed, (SNAKE_TYPES[type_1], SNAKE_TYPES[type_2]), cols, rows, ticks, checksum_every, game_state,
+                      checksums, directions)
+    return episode, offset + size
+
+
+def save(path: str, episodes, compress: bool = True) -> int:
+    """
+    Write episodes into an archive
+    :return: size of the file in bytes
+    """
+    size = 0
+    with open(path, "wb") as f:
+        for episode in episodes:
+            size += f.write(to_bytes(episode, compress))
+    return size
+
+
+def load(path: str):
+    """ Iterate over the episodes of an archive """
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        episode, offset = from_bytes(data, offset)
+        yield episode
+
+
+class Replayer:
+    """
+    Plays a recorded episode again on a headless Game. The directions of the external snakes come from
+    the episode, bots and search snakes move by the random number generator of the game, which is
+    seeded like in the recording. Every stored checksum is compared with the replayed state.
+    """
+
+    def __init__(self, episode: Episode, verify: bool = True):
+        """
+        :param verify: raise a ValueError as soon as the replay differs from the recording
+        """
+        self.episode = episode
+        self.verify = verify
+        self.game = Game(episode.cols * BLOCK_SIZE, episode.rows * BLOCK_SIZE, snake_1_type=episode.snake_types[0],
+                         snake_2_type=episode.snake_types[1])
+        self.external = [snake for snake, kind in zip((self.game.snake_1, self.game.snake_2), episode.snake_types)
+                         if kind == "snake"]
+        self.directions = unpack(episode.directions, episode.ticks * len(self.external)).tolist()
+        self.last_checksum = episode.ticks if not episode.checksum_every or episode.ticks % episode.checksum_every else -1
+        self.reset()
+
+    def reset(self) -> None:
+        """ Go back to tick 0 """
+        self.game.reset(self.episode.seed)
+
+    def step(self) -> int:
+        """
+        Replay the next tick
+        :return: game state after the tick, see Game.is_colliding
+        """
+        game = self.game
+        assert game.tick < self.episode.ticks, "The episode is over"
+
+        n = len(self.external)
+        for i, snake in enumerate(self.external):
+            snake.direction = DIRECTIONS[self.directions[game.tick * n + i]]
+        game.play_step()
+
+        if self.verify:
+            self._check()
+        return game.game_state
+
+    def _check(self) -> None:
+        """ Compare the state with the checksum recorded for this tick, if there is one """
+        game, episode = self.game, self.episode
+        if episode.checksum_every and game.tick % episode.checksum_every == 0:
+            index = game.tick // episode.checksum_every - 1
+        elif game.tick == self.last_checksum:
+            index = len(episode.checksums) - 1
+        else:
+            return
+        if state_checksum(game) != episode.checksums[index]:
+            raise ValueError(f"Replay of seed {episode.seed} diverged from the recording before tick {game.tick}")
+
+    def seek(self, tick: int) -> Game:
+        """
+        Reconstruct the state after the given tick, fast forwarding headless from the start if needed
+        :return: the game at that tick
+        """
+        assert 0 <= tick <= self.episode.ticks, f"Tick {tick} is not in the episode of {self.episode.ticks} ticks"
+        if tick < self.game.tick:
+            self.reset()
+        while self.game.tick < tick:
+            self.step()
+        return self.game
+
+    def run(self) -> int:
+        """ Replay until the end, the last game state has to match the recorded one """
+        self.seek(self.episode.ticks)
+        if self.game.game_state != self.episode.game_state:
+            raise ValueError(f"Replay of seed {self.episode.seed} ended with game state {self.game.game_state}, "
+                             f"recorded {self.episode.game_state}")
+        return self.game.game_state
+
+
+def record_games(path: str, seeds: list[int], grid_size: int = 5, max_steps: int = 2000,
+                 checksum_every: int = CHECKSUM_EVERY) -> list[Episode]:
+    """
+    Record games of a checkpoint against the bot, like evaluate.play_games but one game at a time
+    :param path: checkpoint, .zip or .npz
+    """
+    from envs import ENVS
+    from evaluate import detect_env, load_model
+
+    model = load_model(path)
+    env_type, options = detect_env(model, grid_size)
+    env = ENVS[env_type](show=False, grid_size=grid_size, **options)
+    recorder = Recorder(env.game, checksum_every)
+
+    episodes = []
+    for seed in seeds:
+        model.set_random_seed(seed)
+        observation, _ = env.reset(seed=seed)
+        recorder.begin(seed)
+        done = False
+        while not done and env.game.tick < max_steps:
+            action, _ = model.predict(observation)
+            observation, _, done, _, _ = env.step(int(action))
+            recorder.record()
+        episodes.append(recorder.end())
+    return episodes
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Record games compactly and replay them deterministically")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="record games of a checkpoint against the bot")
+    record.add_argument("model", help="checkpoint, e.g. ppo_snake_safe_5.npz")
+    record.add_argument("output", help="archive to write, e.g. games.snkr")
+    record.add_argument("--games", type=int, default=1000, help="number of games")
+    record.add_argument("--seed", type=int, default=0, help="seed of the first game, game i uses seed + i")
+    record.add_argument("--max-steps", type=int, default=2000, help="games are cut off after this many steps")
+    record.add_argument("--grid-size", type=int, default=5, help="size of the observation window of the model")
+    record.add_argument("--checksum-every", type=int, default=CHECKSUM_EVERY, help="ticks between state checksums")
+
+    verify = commands.add_parser("verify", help="replay all games of an archive and compare them with the recording")
+    verify.add_argument("archive", help="archive written by record")
+
+    show = commands.add_parser("show", help="watch one game of an archive")
+    show.add_argument("archive", help="archive written by record")
+    show.add_argument("--index", type=int, default=0, help="game in the archive")
+    show.add_argument("--tick", type=int, default=0, help="fast forward to this tick before showing the game")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+
+    if args.command == "record":
+        start = time.perf_counter()
+        episodes = record_games(args.model, list(range(args.seed, args.seed + args.games)), args.grid_size,
+                                args.max_steps, args.checksum_every)
+        size = save(args.output, episodes)
+        ticks = sum(episode.ticks for episode in episodes)
+        print(f"Recorded {len(episodes)} games with {ticks} ticks in {time.perf_counter() - start:.1f}s, "
+              f"{size} bytes ({size / len(episodes):.1f} per game, {8 * size / ticks:.2f} bits per tick)")
+
+    elif args.command == "verify":
+        start = time.perf_counter()
+        games = ticks = 0
+        for episode in load(args.archive):
+            Replayer(episode).run()
+            games += 1
+            ticks += episode.ticks
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {games} games with {ticks} ticks in {elapsed:.1f}s ({ticks / elapsed:.0f} ticks/s), all match")
+
+    else:
+        from viewer import Viewer
+
+        episode = next(episode for i, episode in enumerate(load(args.archive)) if i == args.index)
+        replayer = Replayer(episode)
+        viewer = Viewer(replayer.seek(args.tick), buffer=episode.ticks + 1).start()
+        viewer.publish()
+        while replayer.game.tick < episode.ticks:
+            replayer.step()
+            viewer.publish()
+        viewer.close(timeout=None)  # show the whole game
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import numpy as np
+from stable_baselines3.common.callbacks import BaseCallback
+from stable_baselines3.common.vec_env import VecEnv
+
+from envs import ENVS
+from export_policy import policy_arrays
+from numpy_policy import NumpyPolicy
+from observation import ObservationBuilder
+from snake import LEFT_TURN, RIGHT_TURN
+
+class SelfPlayVecEnv(VecEnv):
+    """
+    N games of SnakeEnv / SafeSnakeEnv where snake 2 is driven by a frozen copy of the learner instead of the bot.
+    Snake 1 is controlled by the actions, observations, rewards and infos are the ones of the single game
+    environments. After every step the observations of snake 2 are built from the same game states as the
+    ones of snake 1, so the opponent needs one batched forward pass of its NumpyPolicy per step for all games.
+    Finished games are reset automatically, their last observation is returned in info["terminal_observation"].
+
+    The opponent is set by set_opponent, usually by SelfPlayCallback with a snapshot of the learner.
+    """
+
+    render_mode = None
+
+    def __init__(
+            self,
+            num_envs: int,
+            env_type: str = "snake",
+            grid_size: int = 5,
+            opponent: NumpyPolicy = None,
+            deterministic_opponent: bool = False
+    ):
+        assert env_type in ENVS, f"Invalid env type: Input - {env_type}, Expected - snake/safe"
+
+        # both snakes of the games are moved from outside, see Game
+        self.envs = [ENVS[env_type](show=False, grid_size=grid_size, copy_obs=False, snake_2_type="snake")
+                     for _ in range(num_envs)]
+
+        board = self.envs[0].game.board
+        self.opponent_observer = ObservationBuilder(board.cols, board.rows, grid_size, deadly=env_type == "safe", player=2)
+        self.opponent = opponent
+        self.deterministic_opponent = deterministic_opponent
+
+        observation_space = self.envs[0].observation_space
+        self.observations = np.zeros((num_envs, *observation_space.shape), dtype=np.float32)
+        self.opponent_observations = np.zeros_like(self.observations)
+        self.actions = None
+        super().__init__(num_envs, observation_space, self.envs[0].action_space)
+
+    def set_opponent(self, opponent: NumpyPolicy) -> None:
+        """ Let the given policy drive snake 2 from the next step on """
+        self.opponent = opponent
+
+    def reset(self) -> np.ndarray:
+        for i, env in enumerate(self.envs):
+            maybe_options = {"options": self._options[i]} if self._options[i] else {}
+            self.observations[i], _ = env.reset(seed=self._seeds[i], **maybe_options)
+            self.opponent_observations[i] = self.opponent_observer.build(env.game, copy=False)
+        self._reset_seeds()
+        self._reset_options()
+        return self.observations.copy()
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.actions = np.asarray(actions).reshape(self.num_envs)
+
+    def step_wait(self):
+        assert self.opponent is not None, "Set an opponent with set_opponent before stepping"
+
+        # one forward pass for the snakes 2 of all games
+        opponent_actions, _ = self.opponent.predict(self.opponent_observations, deterministic=self.deterministic_opponent)
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        dones = np.zeros(self.num_envs, dtype=bool)
+        infos = []
+        for i, env in enumerate(self.envs):
+            snake = env.game.snake_2
+            if opponent_actions[i] == 2:  # turn left
+                snake.direction = LEFT_TURN[snake.direction]
+            elif opponent_actions[i] == 0:  # turn right
+                snake.direction = RIGHT_TURN[snake.direction]
+
+            observation, rewards[i], terminated, truncated, info = env.step(self.actions[i])
+            dones[i] = terminated or truncated
+            if dones[i]:
+                info["terminal_observation"] = observation.copy()
+                info["TimeLimit.truncated"] = truncated and not terminated
+                observation, _ = env.reset()
+
+            self.observations[i] = observation
+            self.opponent_observations[i] = self.opponent_observer.build(env.game, copy=False)
+            infos.append(info)
+
+        return self.observations.copy(), rewards, dones, infos
+
+    def close(self) -> None:
+        for env in self.envs:
+            env.close()
+
+    def get_attr(self, attr_name: str, indices=None) -> list:
+        return [getattr(self.envs[i], attr_name) for i in self._get_indices(indices)]
+
+    def set_attr(self, attr_name: str, value, indices=None) -> None:
+        for i in self._get_indices(indices):
+            setattr(self.envs[i], attr_name, value)
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> list:
+        return [getattr(self.envs[i], method_name)(*method_args, **method_kwargs) for i in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> list:
+        return [False for _ in self._get_indices(indices)]
+
+
+class SelfPlayCallback(BaseCallback):
+    """
+    Refreshes the opponent of a SelfPlayVecEnv with a frozen copy of the learner at the start of
+    training and every refresh_steps environment steps
+    """
+
+    def __init__(self, env: SelfPlayVecEnv, refresh_steps: int = 20000, verbose: int = 0):
+        super().__init__(verbose)
+        self.env = env
+        self.refresh_steps = refresh_steps
+        self.last_refresh = 0
+
+    def refresh(self) -> None:
+        self.env.set_opponent(NumpyPolicy.from_arrays(policy_arrays(self.model), seed=self.num_timesteps))
+        self.last_refresh = self.num_timesteps
+        if self.verbose > 0:
+            print(f"Refreshed the self-play opponent at {self.num_timesteps} steps")
+
+    def _on_training_start(self) -> None:
+        self.refresh()
+
+    def _on_step(self) -> bool:
+        if self.num_timesteps - self.last_refresh >= self.refresh_steps:
+            self.refresh()
+        return True
@@ -0,0 +1,124 @@
+import multiprocessing as mp
+from typing import Callable
+
+import cloudpickle
+import gymnasium as gym
+import numpy as np
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv
+
+from shm_worker import SharedArray, worker
+
+
+class SharedMemoryVecEnv(VecEnv):
+    """
+    Runs every environment in its own process like SB3's SubprocVecEnv, but observations, actions, rewards
+    and dones are exchanged through shared memory arrays instead of being pickled through the pipes.
+    The pipes only carry the command and the (usually empty) info dict of each step.
+    Only environments with a Box observation space and a Discrete action space are supported.
+
+    :param env_fns: Environments to run in subprocesses
+    :param start_method: method used to start the subprocesses, 'forkserver' if available, else 'spawn'
+    """
+
+    def __init__(self, env_fns: list[Callable[[], gym.Env]], start_method: str = None):
+        self.waiting = False
+        self.closed = False
+        n_envs = len(env_fns)
+
+        # the spaces are read from a throwaway instance, the environments are cheap to build headless
+        env = env_fns[0]()
+        observation_space, action_space = env.observation_space, env.action_space
+        env.close()
+
+        self.shared = {
+            "observations": SharedArray((n_envs, *observation_space.shape), observation_space.dtype),
+            "terminal_observations": SharedArray((n_envs, *observation_space.shape), observation_space.dtype),
+            "actions": SharedArray((n_envs,), np.int64),
+            "rewards": SharedArray((n_envs,), np.float32),
+            "dones": SharedArray((n_envs,), bool),
+        }
+        specs = {key: array.spec for key, array in self.shared.items()}
+
+        if start_method is None:
+            start_method = "forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn"
+        ctx = mp.get_context(start_method)
+
+        self.remotes, self.work_remotes = zip(*[ctx.Pipe() for _ in range(n_envs)])
+        self.processes = []
+        for index, (work_remote, remote, env_fn) in enumerate(zip(self.work_remotes, self.remotes, env_fns)):
+            # the factory is pickled here, so the worker does not have to import stable_baselines3 to unpickle it
+            args = (work_remote, remote, cloudpickle.dumps(env_fn), index, specs)
+            # daemon=True: if the main process crashes, we should not cause things to hang
+            process = ctx.Process(target=worker, args=args, daemon=True)
+            process.start()
+            self.processes.append(process)
+            work_remote.close()
+
+        super().__init__(n_envs, observation_space, action_space)
+
+    def step_async(self, actions: np.ndarray) -> None:
+        self.shared["actions"].array[:] = np.asarray(actions).reshape(self.num_envs)
+        for remote in self.remotes:
+            remote.send(("step", None))
+        self.waiting = True
+
+    def step_wait(self):
+        infos = [remote.recv() for remote in self.remotes]
+        self.waiting = False
+
+        dones = self.shared["dones"].array.copy()
+        for index in np.flatnonzero(dones):
+            infos[index]["terminal_observation"] = self.shared["terminal_observations"].array[index].copy()
+
+        return self.shared["observations"].array.copy(), self.shared["rewards"].array.copy(), dones, infos
+
+    def reset(self) -> np.ndarray:
+        for env_idx, remote in enumerate(self.remotes):
+            remote.send(("reset", (self._seeds[env_idx], self._options[env_idx])))
+        self.reset_infos = [remote.recv() for remote in self.remotes]
+        # Seeds and options are only used once
+        self._reset_seeds()
+        self._reset_options()
+        return self.shared["observations"].array.copy()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        if self.waiting:
+            for remote in self.remotes:
+                remote.recv()
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        for array in self.shared.values():
+            array.close()
+        self.closed = True
+
+    def get_attr(self, attr_name: str, indices=None) -> list:
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("get_attr", attr_name))
+        return [remote.recv() for remote in target_remotes]
+
+    def set_attr(self, attr_name: str, value, indices=None) -> None:
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("set_attr", (attr_name, value)))
+        for remote in target_remotes:
+            remote.recv()
+
+    def env_method(self, method_name: str, *method_args, indices=None, **method_kwargs) -> list:
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("env_method", (method_name, method_args, method_kwargs)))
+        return [remote.recv() for remote in target_remotes]
+
+    def env_is_wrapped(self, wrapper_class, indices=None) -> list:
+        target_remotes = self._get_target_remotes(indices)
+        for remote in target_remotes:
+            remote.send(("is_wrapped", wrapper_class))
+        return [remote.recv() for remote in target_remotes]
+
+    def _get_target_remotes(self, indices) -> list:
+        return [self.remotes[i] for i in self._get_indices(indices)]
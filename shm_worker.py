@@ -0,0 +1,96 @@
+from multiprocessing import shared_memory
+from multiprocessing.connection import Connection
+
+import cloudpickle
+import numpy as np
+
+# Code run in the worker processes of SharedMemoryVecEnv. It is kept apart from shm_vec_env.py, so a worker
+# only imports NumPy and its environment instead of stable_baselines3 and torch.
+
+
+class SharedArray:
+    """ NumPy array living in a shared memory block, can be attached from other processes by its spec """
+
+    def __init__(self, shape: tuple, dtype, name: str = None):
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        size = max(int(np.prod(shape)) * self.dtype.itemsize, 1)
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.array = np.ndarray(shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    @property
+    def spec(self) -> tuple:
+        """ Everything another process needs to attach to the array """
+        return self.shape, self.dtype.str, self.shm.name
+
+    def close(self) -> None:
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def worker(
+        remote: Connection,
+        parent_remote: Connection,
+        env_fn: bytes,
+        index: int,
+        specs: dict
+) -> None:
+    """
+    Main loop of a worker process of SharedMemoryVecEnv, steps its environment on the commands of the pipe
+    :param env_fn: cloudpickled function creating the environment
+    :param index: row of the environment in the shared arrays
+    :param specs: name -> spec of the shared arrays, see SharedArray.spec
+    """
+    parent_remote.close()
+    env = cloudpickle.loads(env_fn)()
+    shared = {key: SharedArray(shape, dtype, name) for key, (shape, dtype, name) in specs.items()}
+    observations = shared["observations"].array
+    terminal_observations = shared["terminal_observations"].array
+    actions = shared["actions"].array
+    rewards = shared["rewards"].array
+    dones = shared["dones"].array
+
+    while True:
+        try:
+            cmd, data = remote.recv()
+            if cmd == "step":
+                observation, reward, terminated, truncated, info = env.step(actions[index])
+                # convert to SB3 VecEnv api, the final observation is copied to the parent on done
+                done = terminated or truncated
+                info["TimeLimit.truncated"] = truncated and not terminated
+                if done:
+                    terminal_observations[index] = observation
+                    observation, _ = env.reset()
+                observations[index] = observation
+                rewards[index] = reward
+                dones[index] = done
+                remote.send(info)
+            elif cmd == "reset":
+                maybe_options = {"options": data[1]} if data[1] else {}
+                observation, reset_info = env.reset(seed=data[0], **maybe_options)
+                observations[index] = observation
+                remote.send(reset_info)
+            elif cmd == "close":
+                env.close()
+                remote.close()
+                break
+            elif cmd == "env_method":
+                method = env.get_wrapper_attr(data[0])
+                remote.send(method(*data[1], **data[2]))
+            elif cmd == "get_attr":
+                remote.send(env.get_wrapper_attr(data))
+            elif cmd == "set_attr":
+                remote.send(setattr(env, data[0], data[1]))
+            elif cmd == "is_wrapped":
+                from stable_baselines3.common.env_util import is_wrapped
+                remote.send(is_wrapped(env, data))
+            else:
+                raise NotImplementedError(f"`{cmd}` is not implemented in the worker")
+        except EOFError:
+            break
+
+    for array in shared.values():
+        array.close()
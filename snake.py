@@ -1,6 +1,14 @@
 from collections import deque
 import random
-import math
+from board import Board
+
+DIRECTIONS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+
+# turned directions and the moves straight, left, right of every direction, looked up instead of
+# building new tuples on every step
+LEFT_TURN = {(dx, dy): (-dy, dx) for dx, dy in DIRECTIONS}
+RIGHT_TURN = {(dx, dy): (dy, -dx) for dx, dy in DIRECTIONS}
+CANDIDATE_MOVES = {direction: (direction, LEFT_TURN[direction], RIGHT_TURN[direction]) for direction in DIRECTIONS}
 
 class Snake:
 
@@ -9,12 +17,29 @@ class Snake:
             init_x: int,
             init_y: int,
             init_length: int,
-            init_direction: tuple[int, int] = (-1, 0)
+            init_direction: tuple[int, int] = (-1, 0),
+            board: Board = None
     ):
-        self.directions = {(1,0),(0,1),(-1,0),(0,-1)}
         self.direction = init_direction # (x, y) direction ranging from -1 to 1
         self.body = deque([(init_x - self.direction[0] * i, init_y - self.direction[1] * i) for i in range(init_length)])
 
+        # initial state, restored by reset
+        self.init_direction = init_direction
+        self.init_body = tuple(self.body)
+
+        # occupancy grid shared with the other snakes of the game, kept up to date by move
+        self.board = board
+        self.owner = board.register(self) if board is not None else None
+
+    def reset(self) -> None:
+        """
+        Restore the initial body and direction of the snake in place, the board has to be reset afterwards
+        :return: None
+        """
+        self.direction = self.init_direction
+        self.body.clear()
+        self.body.extend(self.init_body)
+
     def move(self, direction: tuple[int, int], apple_eaten: bool) -> None:
         """
         Move the snake in the given direction, update body and direction
@@ -32,14 +57,18 @@ class Snake:
 
         # Calculate new head position
         head_x, head_y = self.body[0]
-        new_head = (head_x + self.direction[0], head_y + self.direction[1])
+        new_head = (head_x + direction[0], head_y + direction[1])
 
         # Add new head to the body
         self.body.appendleft(new_head)
+        if self.board is not None:
+            self.board.add(self.owner, new_head)
 
         # Remove the tail
         if not apple_eaten:
-            self.body.pop()
+            tail = self.body.pop()
+            if self.board is not None:
+                self.board.remove(self.owner, tail)
 
     def is_self_colliding(self, direction: tuple[int, int]) -> bool:
         """
@@ -52,73 +81,128 @@ class Snake:
         head_x, head_y = self.body[0]
         new_head = (head_x + direction[0], head_y + direction[1])
 
-        # Check if new head is in the body
-        return new_head in list(self.body)[:-1]
+        if self.board is None:
+            # Check if new head is in the body
+            return new_head in list(self.body)[:-1]
+
+        # Check if new head is in the body without its tail, the tail moves away in the same step
+        return self.board.count(self.owner, new_head) - (self.body[-1] == new_head) > 0
 
 
 class BotSnake(Snake):
+    """
+    Snake driven by a simple policy. Every decision enumerates the at most three moves (straight, left, right)
+    once against the board and drops those running into the border or the own body. Optionally moves into
+    other snakes, next to their heads or into dead ends are avoided as long as another legal move is left.
+    """
+
+    def __init__(self, init_x: int, init_y: int, init_length: int, init_direction: tuple[int, int] = (-1, 0),
+                 board: Board = None, rng: random.Random = None, bias: float = 0.7,
+                 avoid_opponent: bool = False, avoid_dead_ends: bool = False):
+        super().__init__(init_x, init_y, init_length, init_direction, board)
+        self.rng = rng if rng is not None else random  # random number generator of the game, global by default
+        self.bias = bias  # probability of taking the legal move closest to the apple
+        self.avoid_opponent = avoid_opponent  # avoid other snakes and the cells next to their heads
+        self.avoid_dead_ends = avoid_dead_ends  # avoid cells without a free neighbour
+
+    def legal_moves(self, cols: int, rows: int) -> list[tuple[int, int]]:
+        """
+        Moves that neither leave the playground nor run into the own body, the tail moves away in the same step
+        :param cols: width of the playground in cells
+        :param rows: height of the playground in cells
+        :return: subset of straight, left, right in this order
+        """
+        head_x, head_y = self.body[0]
+        moves = []
+        for move in CANDIDATE_MOVES[self.direction]:
+            x, y = head_x + move[0], head_y + move[1]
+            if 0 <= x < cols and 0 <= y < rows and not self.is_self_colliding(move):
+                moves.append(move)
+        return moves
+
+    def safe_moves(self, moves: list[tuple[int, int]], cols: int, rows: int) -> list[tuple[int, int]]:
+        """
+        Drop the moves avoided by avoid_opponent / avoid_dead_ends, needs the board of the game
+        :param moves: legal moves
+        :return: remaining moves, the legal moves if none is left
+        """
+        if self.board is None or not (self.avoid_opponent or self.avoid_dead_ends):
+            return moves
 
-    def __init__(self, init_x: int, init_y: int, init_length: int, init_direction: tuple[int, int] = (-1, 0)):
-        super().__init__(init_x, init_y, init_length, init_direction)
+        head_x, head_y = self.body[0]
+        safe = [move for move in moves if self._is_safe((head_x + move[0], head_y + move[1]), cols, rows)]
+        return safe if safe else moves
+
+    def _is_safe(self, cell: tuple[int, int], cols: int, rows: int) -> bool:
+        x, y = cell
+
+        if self.avoid_opponent:
+            for other in self.board.snakes:
+                if other is self:
+                    continue
+                if self.board.count(other.owner, cell) > 0:
+                    return False
+                other_x, other_y = other.body[0]
+                if abs(other_x - x) + abs(other_y - y) == 1:  # the other head can move there as well
+                    return False
+
+        if self.avoid_dead_ends:
+            tail = self.body[-1]
+            for nx, ny in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if 0 <= nx < cols and 0 <= ny < rows and (nx, ny) != self.body[0] \
+                        and (not self.board.is_occupied((nx, ny)) or (nx, ny) == tail):
+                    break
+            else:
+                return False
+
+        return True
 
     def get_random_direction(self, playground_info: tuple[int, int, int]) -> tuple[int, int]:
         """
         Gets a random, but valid direction for the bot snake
         :param playground_info: (width, height, block_size)
-        :return: new direction
+        :return: new direction, the current one if there is no valid move
         """
         width, height, block_size = playground_info
-        new_direction = (0, 0)
-        direction = self.direction
-        tries = 0
-        max_tries = 500
-
-        possible_directions = self.directions - {(-direction[0], -direction[1])}
-
-        while (self.is_self_colliding(new_direction)
-               or not (0 <= self.body[0][0] + new_direction[0] < width // block_size)
-               or not (0 <= self.body[0][1] + new_direction[1] < height // block_size)
-                ) and tries < max_tries:
-            new_direction = random.choice(list(possible_directions))
-            tries += 1
+        cols, rows = width // block_size, height // block_size
+        moves = self.safe_moves(self.legal_moves(cols, rows), cols, rows)
 
-        return new_direction if tries < max_tries else direction
+        return self.rng.choice(moves) if moves else self.direction
 
     def get_random_biased_direction(self, playground_info: tuple[int, int, int], apple_location: tuple[int,int]) -> tuple[int, int]:
         """
-        Gets a random, but valid direction for the bot snake with bias towards the apple
+        Gets a random, but valid direction for the bot snake with bias towards the apple. The valid move closest
+        to the apple is taken with probability bias, otherwise one of the other valid moves.
         :param playground_info: (width, height, block_size)
-        :return: new direction
+        :param apple_location: (x, y) of the apple in pixels
+        :return: new direction, the current one if there is no valid move
         """
-
         width, height, block_size = playground_info
-        new_direction = (0, 0)
-        direction = self.direction
-        tries = 0
-        max_tries = 500
-        bias = 0.7
-        possible_directions = self.directions - {(-direction[0], -direction[1])}
-
-        while (self.is_self_colliding(new_direction)
-               or not (0 <= self.body[0][0] + new_direction[0] < width // block_size)
-               or not (0 <= self.body[0][1] + new_direction[1] < height // block_size)
-        ) and tries < max_tries:
-            distances = [(math.sqrt((self.body[0][0] + d[0] - apple_location[0]// block_size) ** 2 + (self.body[0][1] + d[1] - apple_location[1]// block_size) ** 2), d) for d in possible_directions]
-            distances.sort(key=lambda x: x[0])
-            if random.random() < bias:
-                new_direction = distances[0][1]
-            else:
-                new_direction = random.choice(distances[1:])[1]
-            tries += 1
+        cols, rows = width // block_size, height // block_size
+        moves = self.safe_moves(self.legal_moves(cols, rows), cols, rows)
+
+        if not moves:
+            return self.direction
 
-        return new_direction if tries < max_tries else direction
+        head_x, head_y = self.body[0]
+        apple_x, apple_y = apple_location[0] // block_size, apple_location[1] // block_size
+        best = min(moves, key=lambda move: (head_x + move[0] - apple_x) ** 2 + (head_y + move[1] - apple_y) ** 2)
+
+        if len(moves) == 1 or self.rng.random() < self.bias:
+            return best
+        return self.rng.choice([move for move in moves if move != best])
 
 class PlayerSnake(Snake):
 
-    def __init__(self, init_x: int, init_y: int, init_length: int, init_direction: tuple[int, int] = (-1, 0)):
-        super().__init__(init_x, init_y, init_length, init_direction)
+    def __init__(self, init_x: int, init_y: int, init_length: int, init_direction: tuple[int, int] = (-1, 0),
+                 board: Board = None):
+        super().__init__(init_x, init_y, init_length, init_direction, board)
         self.changed: bool = False # Whether the direction has been changed, set to False after each move
 
+    def reset(self) -> None:
+        super().reset()
+        self.changed = False
+
     def change_direction(self, new_direction: tuple[int, int]) -> None:
         """
         Change the direction of the snake
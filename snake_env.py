@@ -0,0 +1,142 @@
+import gymnasium as gym
+from gymnasium import spaces
+
+from game import Game
+from profiler import StepProfiler
+from snake import LEFT_TURN, RIGHT_TURN
+
+
+class SnakeGameEnv(gym.Env):
+    """
+    Step shared by SnakeEnv, SafeSnakeEnv and SafeSnakeEnvAgainstHuman: snake 1 turns by the action, the game
+    advances one tick, the observer builds the observation of snake 1 and the reward is read from the new
+    game state. Every phase is timed by the optional profiler. Subclasses create the observer and the
+    observation space and define the reward, either by REWARDS per game state or by overriding _reward.
+    """
+    metadata = {'render.modes': ['human']}
+
+    # reward of snake 1 per game state
+    REWARDS = {}
+
+    def __init__(self, show: bool = True, grid_size=5, profiler: StepProfiler = None, copy_obs: bool = True,
+                 snake_2_type: str = "bot", game: Game = None):
+        """
+        :param show: show the game in a window of a Viewer
+        :param copy_obs: False returns the reused observation buffer, see ObservationBuilder.build
+        :param snake_2_type: see Game, "snake" lets the caller move snake 2, e.g. SelfPlayVecEnv
+        :param game: play on this game instead of a new one, e.g. another board size or prepared start bodies
+                     (see benchmark.py), snake 1 must be moved by the caller, snake_2_type is ignored then
+        """
+        super().__init__()
+        self.game = game if game is not None else Game(snake_2_type=snake_2_type)
+        self.action_space = spaces.Discrete(3)  # 1 = same dir; 2 = left; 3 = right
+        self.show_ui = show
+        self.viewer = None  # headless unless the game is shown
+        if show:
+            from viewer import Viewer  # pygame is only loaded for a window
+            self.viewer = Viewer(self.game).start()
+        self.ai_score = 0
+        self.bot_score = 0
+        self.grid_size = grid_size
+        self.observer = None  # ObservationBuilder, created by the subclass
+        self.profiler = profiler  # optional per-phase timing, shared with the game
+        self.copy_obs = copy_obs
+        self.game.profiler = profiler
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
+        self.game.reset(seed)
+        if self.profiler is not None:
+            self.profiler.count("env_resets")
+        return (self._get_observation(), {})
+
+    def step(self, action):
+        profiler = self.profiler
+        if profiler is not None:
+            t = profiler.start()
+
+        if action == 1:  # maintain current direction
+            pass
+        elif action == 2:  # turn left
+            self.game.snake_1.direction = LEFT_TURN[self.game.snake_1.direction]
+        elif action == 0:  # turn right
+            self.game.snake_1.direction = RIGHT_TURN[self.game.snake_1.direction]
+
+        if profiler is not None:
+            t = profiler.record("env.action", t)
+
+        self.game.play_step()
+
+        if profiler is not None:
+            t = profiler.record("env.play_step", t)
+
+        obs = self._get_observation()
+        game_state = self.game.game_state
+        done = abs(game_state) == 1
+
+        if profiler is not None:
+            t = profiler.start()
+
+        reward = self._reward(game_state)
+
+        # Update scores based on game state
+        if game_state == 1:
+            self.ai_score += 1
+        elif game_state == -1:
+            self.bot_score += 1
+
+        terminated = done
+        truncated = False  # Set this to True if you have a time limit or other truncation condition
+
+        if profiler is not None:
+            profiler.record("env.reward", t)
+            profiler.count("env_steps")
+
+        info = self._step_info(done)
+
+        return obs, reward, terminated, truncated, info
+
+    def _reward(self, game_state: int) -> float:
+        """
+        Reward of snake 1 for the step that led to the game state, called right after the observation was built
+        :return: reward
+        """
+        return self.REWARDS[game_state]
+
+    def _step_info(self, done: bool) -> dict:
+        """
+        Info returned by step
+        :param done: the episode is over
+        :return: the events of a finished episode as array (see events.py), so callers can classify the
+                 outcome without a reference to the game, otherwise an empty dict
+        """
+        return {"events": self.game.events_array()} if done else {}
+
+    def render(self, mode='human'):
+        """ Hand the current state to the viewer, which draws at most FPS times per second """
+        if self.viewer is not None:
+            self.viewer.publish()
+
+    def close(self):
+        """ Show the remaining frames for a few seconds at most and close the window """
+        if self.viewer is not None:
+            self.viewer.close()
+            self.viewer = None
+
+    def _get_observation(self):
+        profiler = self.profiler
+        if profiler is not None:
+            t = profiler.start()
+
+        if self.viewer is not None:
+            self.viewer.publish()
+
+            if profiler is not None:
+                t = profiler.record("env.render", t)
+
+        observation = self.observer.build(self.game, copy=self.copy_obs)
+
+        if profiler is not None:
+            profiler.record("env.observation", t)
+
+        return observation
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from batch_env import BatchSnakeEnv
+
+
+@pytest.mark.parametrize("env_type", ["snake", "safe"])
+@pytest.mark.parametrize("grid_size", [1, 2, 3, 4, 5])
+def test_every_grid_size_steps(env_type, grid_size):
+    if grid_size % 2 == 0:
+        # the single game environments do not support even window sizes either
+        with pytest.raises(AssertionError):
+            BatchSnakeEnv(64, env_type=env_type, grid_size=grid_size, seed=0)
+        return
+
+    env = BatchSnakeEnv(64, env_type=env_type, grid_size=grid_size, seed=0)
+    obs = env.reset()
+    assert obs.shape == (64,) + env.observation_space.shape
+    for _ in range(200):
+        obs, rewards, dones, infos = env.step(env.rng.integers(0, 3, env.num_envs))
+        assert obs.shape == (64,) + env.observation_space.shape
+
+
+def test_no_apple_on_a_full_board():
+    env = BatchSnakeEnv(2, seed=0)
+    env.reset()
+    env.counts[1, 0, ~env.wall] = 1
+    with pytest.raises(Exception, match="No available positions"):
+        env._place_apples(np.array([0, 1]))
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from benchmark import make_game
+from game import Game
+
+
+def scanned_counts(game) -> np.ndarray:
+    """ Segments of every snake per cell counted from the bodies, cells off the playground are not tracked """
+    board = game.board
+    counts = np.zeros_like(board.counts)
+    for snake in board.snakes:
+        for x, y in snake.body:
+            if 0 <= x < board.cols and 0 <= y < board.rows:
+                counts[snake.owner, x, y] += 1
+    return counts
+
+
+def play(game, steps: int):
+    """ Advance the game, start a new game whenever one is over, and yield after every step """
+    for _ in range(steps):
+        game.play_step()
+        yield
+        if abs(game.game_state) == 1:
+            game.reset()
+            yield
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_counts_match_the_bodies(seed):
+    game = Game(snake_1_type="bot", seed=seed)
+    board = game.board
+    assert np.array_equal(board.counts, scanned_counts(game))
+    for _ in play(game, 2000):
+        counts = scanned_counts(game)
+        assert np.array_equal(board.counts, counts)
+        assert board.total == counts.sum(axis=0).ravel().tolist()
+
+
+@pytest.mark.parametrize("cols, rows, length", [(20, 16, 50), (40, 32, 200)])
+def test_counts_match_long_bodies(cols, rows, length):
+    game = make_game(cols, rows, length, seed=0)
+    board = game.board
+    for _ in play(game, 500):
+        counts = scanned_counts(game)
+        assert np.array_equal(board.counts, counts)
+        assert board.total == counts.sum(axis=0).ravel().tolist()
+
+
+def assert_free_list(board) -> None:
+    """ The first n_free entries of free are exactly the cells without a segment, free_index points into free """
+    free = board.free[:board.n_free]
+    assert set(free) == {code for code, total in enumerate(board.total) if total == 0}
+    assert len(free) == len(set(free))
+    assert sorted(board.free) == list(range(board.cols * board.rows))
+    for index, code in enumerate(board.free):
+        assert board.free_index[code] == index
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_free_list_matches_the_counts(seed):
+    game = make_game(20, 16, 50, seed=seed)
+    assert_free_list(game.board)
+    for _ in play(game, 1000):
+        assert_free_list(game.board)
+
+
+def test_random_free_cell():
+    game = Game(snake_1_type="bot", seed=0)
+    board = game.board
+    rng = game.random
+    for _ in play(game, 500):
+        x, y = board.random_free_cell(rng)
+        assert board.in_bounds((x, y))
+        assert not board.is_occupied((x, y))
+
+
+def test_no_free_cell_on_a_full_board():
+    game = Game(seed=0)
+    board = game.board
+    for code in range(board.cols * board.rows):
+        board.add(0, divmod(code, board.rows))
+    assert board.n_free == 0
+    assert board.random_free_cell(game.random) is None
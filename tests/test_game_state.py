@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from game import Game
+from game_state import DIRECTIONS, TURNS, GameState
+from mcts import MCTSPlanner
+
+
+def state_body(state: GameState, player: int) -> list[tuple[int, int]]:
+    """ Cells of the snake from head to tail """
+    body, start = state.body[player], state.start[player]
+    return [divmod(body[(start + i) % state.capacity], state.rows) for i in range(state.length[player])]
+
+
+def apple_cell(game) -> int:
+    return (game.apple.x // game.block_size) * (game.h // game.block_size) + game.apple.y // game.block_size
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_step_follows_the_game(seed):
+    rng = random.Random(seed)
+    game = Game(snake_1_type="snake", snake_2_type="snake", seed=seed)
+    state = GameState.from_game(game)
+    finished = eaten = 0
+
+    for _ in range(3000):
+        directions = [(state.direction[player] + rng.choice(TURNS)) % 4 for player in range(2)]
+        game.snake_1.direction, game.snake_2.direction = (DIRECTIONS[d] for d in directions)
+        game.play_step()
+
+        assert state.step(*directions) == game.game_state
+        assert state.tick == game.tick
+
+        if abs(game.game_state) == 1:
+            finished += 1
+            game.reset()
+            state = GameState.from_game(game)
+        else:
+            eaten += abs(game.game_state) == 2
+            assert state_body(state, 0) == list(game.snake_1.body)
+            assert state_body(state, 1) == list(game.snake_2.body)
+            state.apple = apple_cell(game)  # the state draws its apples from another sequence
+
+    assert finished > 10 and eaten > 0
+
+
+def test_restore_returns_to_the_snapshot():
+    game = Game(snake_1_type="bot", seed=0)
+    for _ in range(20):
+        game.play_step()
+    state = GameState.from_game(game)
+    reference = state.copy()
+    snapshot = state.snapshot()
+
+    rng = random.Random(0)
+    for _ in range(5):
+        for _ in range(50):
+            state.step(state.biased_move(0, rng), state.biased_move(1, rng))
+            if abs(state.game_state) == 1:
+                break
+        state.restore(snapshot)
+        assert state.snapshot() == reference.snapshot()
+
+
+@pytest.mark.parametrize("iterations, time_limit", [(0, None), (0, 0.0), (1, 0.0), (50, None)])
+def test_planner_returns_a_legal_move(iterations, time_limit):
+    game = Game(snake_1_type="bot", seed=0)
+    for _ in range(10):
+        game.play_step()
+    state = GameState.from_game(game)
+    planner = MCTSPlanner(iterations=iterations, time_limit=time_limit, rng=random.Random(0))
+    snapshot = state.snapshot()
+
+    for player in range(2):
+        assert planner.choose(state, player) in state.legal_moves(player)
+        assert state.snapshot() == snapshot
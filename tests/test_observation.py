@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from agent import SnakeEnv
+from benchmark import make_game
+from game import Game
+from observation import ObservationBuilder
+
+
+def reference_observation(game, grid_size: int, player: int) -> list[float]:
+    """ Observation with deadly moves built by scanning the snake bodies, as the environments did before the Board """
+    own, other = (game.snake_1, game.snake_2) if player == 1 else (game.snake_2, game.snake_1)
+    cols, rows = game.w // game.block_size, game.h // game.block_size
+    apple = (game.apple.x // game.block_size, game.apple.y // game.block_size)
+    head_x, head_y = own.body[0]
+    half_size = grid_size // 2
+
+    observation = []
+    for dx in range(-half_size, half_size + 1):
+        for dy in range(-half_size, half_size + 1):
+            cell = (head_x + dx, head_y + dy)
+            if cell in own.body:
+                observation.append(1)
+            elif cell in other.body:
+                observation.append(2)
+            elif cell == apple:
+                observation.append(3)
+            elif 0 <= cell[0] < cols and 0 <= cell[1] < rows:
+                observation.append(0)
+            else:
+                observation.append(-1)
+
+    observation.append(np.sqrt((apple[0] - head_x) ** 2 + (apple[1] - head_y) ** 2))
+    observation.extend((apple[0] - head_x, apple[1] - head_y))
+    observation.extend(own.direction)
+    observation.extend(sorted(np.sqrt((x - head_x) ** 2 + (y - head_y) ** 2) for x, y in other.body)[:3])
+
+    dx, dy = own.direction
+    for x, y in ((head_x + dx, head_y + dy), (head_x - dy, head_y + dx), (head_x + dy, head_y - dx)):
+        deadly = not (0 <= x < cols and 0 <= y < rows) or (x, y) in own.body or (x, y) in other.body
+        observation.append(int(deadly))
+    return observation
+
+
+def states(game, steps: int):
+    """ Advance the game and yield after every step, including the final state of every finished game """
+    yield
+    for _ in range(steps):
+        game.play_step()
+        yield
+        if abs(game.game_state) == 1:
+            game.reset()
+            yield
+
+
+@pytest.mark.parametrize("grid_size", [1, 3, 5, 7, 9, 15])
+@pytest.mark.parametrize("player", [1, 2])
+@pytest.mark.parametrize("length", [5, 50])
+def test_observation_matches_the_reference(grid_size, player, length):
+    game = Game(snake_1_type="bot", seed=0) if length == 5 else make_game(20, 16, length, seed=0)
+    builder = ObservationBuilder(game.board.cols, game.board.rows, grid_size, deadly=True, player=player)
+    num_cells = grid_size * grid_size
+
+    for _ in states(game, 400):
+        observation = builder.build(game)
+        reference = np.array(reference_observation(game, grid_size, player), dtype=np.float32)
+        assert observation.shape == (builder.size,)
+        assert np.array_equal(observation[:num_cells], reference[:num_cells])
+        assert np.allclose(observation[num_cells:], reference[num_cells:])
+
+
+def test_reward_matches_the_reference():
+    env = SnakeEnv(show=False)
+    env.reset(seed=0)
+    game = env.game
+    rng = np.random.default_rng(0)
+    center_x, center_y = game.w // (2 * game.block_size), game.h // (2 * game.block_size)
+
+    for _ in range(3000):
+        _, reward, done, _, _ = env.step(int(rng.integers(3)))
+
+        head_x, head_y = game.snake_1.body[0]
+        min_distance = min(np.sqrt((x - head_x) ** 2 + (y - head_y) ** 2) for x, y in game.snake_2.body)
+        reward_for_0, reward_for_apple = (0.5, 0.05) if min_distance < 3 else (0.02, 7)
+        distance_to_center = np.sqrt((center_x - head_x) ** 2 + (center_y - head_y) ** 2)
+        center_reward = max(0, 1 - distance_to_center / max(center_x, center_y)) * 0.1
+        expected = {2: 0, 1: 50, 0: reward_for_0 + center_reward, -1: -50, -2: reward_for_apple}[game.game_state]
+        assert reward == pytest.approx(expected)
+
+        if done:
+            env.reset()
@@ -0,0 +1,51 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from benchmark import make_game
+from game import Game
+from reachability import Reachability
+
+
+def reference_moves(game, player: int) -> list[float]:
+    """ Share of the board reachable after going straight, left or right, by a breadth-first search over cells """
+    own = game.snake_1 if player == 1 else game.snake_2
+    cols, rows = game.board.cols, game.board.rows
+    blocked = set(game.snake_1.body) | set(game.snake_2.body)
+    if game.game_state != (-2 if player == 1 else 2):
+        blocked.discard(own.body[-1])  # the tail moves away unless the snake grows
+
+    def is_free(cell):
+        return 0 <= cell[0] < cols and 0 <= cell[1] < rows and cell not in blocked
+
+    head_x, head_y = own.body[0]
+    dx, dy = own.direction
+    areas = []
+    for move_x, move_y in ((dx, dy), (-dy, dx), (dy, -dx)):
+        start = (head_x + move_x, head_y + move_y)
+        if not is_free(start):
+            areas.append(0.0)
+            continue
+        reached, queue = {start}, deque([start])
+        while queue:
+            x, y = queue.popleft()
+            for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+                if cell not in reached and is_free(cell):
+                    reached.add(cell)
+                    queue.append(cell)
+        areas.append(len(reached) / (cols * rows))
+    return areas
+
+
+@pytest.mark.parametrize("player", [1, 2])
+@pytest.mark.parametrize("cols, rows, length", [(30, 24, 5), (20, 16, 50), (20, 16, 90)])
+def test_moves_match_a_breadth_first_search(player, cols, rows, length):
+    game = Game(snake_1_type="bot", seed=0) if length == 5 else make_game(cols, rows, length, seed=0)
+    reachability = Reachability(game.board.cols, game.board.rows, player)
+
+    for _ in range(500):
+        game.play_step()
+        if abs(game.game_state) == 1:
+            game.reset()
+        assert np.allclose(reachability.moves(game), reference_moves(game, player))
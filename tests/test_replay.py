@@ -0,0 +1,109 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from game import Game
+from replay import (Recorder, Replayer, from_bytes, load, pack, record_games, save, snake_type,
+                    state_checksum, to_bytes, unpack)
+from snake import CANDIDATE_MOVES
+
+CHECKPOINT = Path(__file__).parent.parent / "ppo_snake_safe_5.npz"
+
+
+def safe_direction(game, snake, rng: random.Random) -> tuple[int, int]:
+    """ Random move of a snake moved by the caller that avoids walls and snakes where it can """
+    board = game.board
+    head_x, head_y = snake.body[0]
+    moves = [(dx, dy) for dx, dy in CANDIDATE_MOVES[snake.direction]
+             if board.in_bounds((head_x + dx, head_y + dy)) and not board.is_occupied((head_x + dx, head_y + dy))]
+    return rng.choice(moves or CANDIDATE_MOVES[snake.direction])
+
+
+def record(seed: int, snake_2_type: str = "bot", max_steps: int = 1000):
+    """
+    Record one game where the snakes of type snake move at random
+    :return: episode and the checksum of the state after every tick
+    """
+    rng = random.Random(seed)
+    game = Game(snake_1_type="snake", snake_2_type=snake_2_type)
+    recorder = Recorder(game)
+    game.reset(seed)
+    recorder.begin(seed)
+    external = [snake for snake in (game.snake_1, game.snake_2) if snake_type(snake) == "snake"]
+
+    checksums = [state_checksum(game)]
+    while abs(game.game_state) != 1 and game.tick < max_steps:
+        for snake in external:
+            snake.direction = safe_direction(game, snake, rng)
+        game.play_step()
+        recorder.record()
+        checksums.append(state_checksum(game))
+    return recorder.end(), checksums
+
+
+@pytest.mark.parametrize("snake_2_type", ["bot", "snake"])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_replay_matches_the_recording(seed, snake_2_type):
+    episode, checksums = record(seed, snake_2_type)
+    assert episode.ticks == len(checksums) - 1
+    replayer = Replayer(episode)
+    assert replayer.run() == episode.game_state
+    assert state_checksum(replayer.game) == checksums[-1]
+
+    # seek forwards and backwards
+    for tick in (episode.ticks // 2, 1, episode.ticks, 0, episode.ticks // 3):
+        assert state_checksum(replayer.seek(tick)) == checksums[tick]
+
+
+def test_episodes_round_trip(tmp_path):
+    episodes = [record(seed)[0] for seed in range(5)]
+    for compress in (True, False):
+        data = b"".join(to_bytes(episode, compress) for episode in episodes)
+        offset = 0
+        for episode in episodes:
+            read, offset = from_bytes(data, offset)
+            assert read == episode
+        assert offset == len(data)
+
+        path = tmp_path / "games.snkr"
+        assert save(path, episodes, compress) == len(data)
+        assert list(load(path)) == episodes
+
+
+def test_pack_round_trip():
+    values = bytearray(random.Random(0).randrange(4) for _ in range(1001))
+    assert unpack(pack(values), len(values)).tolist() == list(values)
+
+
+def test_changed_direction_is_detected():
+    episode, _ = record(0)
+    assert episode.ticks > 100
+    directions = unpack(episode.directions, episode.ticks)
+    directions[episode.ticks // 2] ^= 1  # turn by 90 degrees instead
+    corrupted = episode._replace(directions=pack(bytearray(directions.tobytes())))
+    with pytest.raises(ValueError):
+        Replayer(corrupted).run()
+
+
+def test_changed_checksum_is_detected():
+    episode, _ = record(0)
+    corrupted = episode._replace(checksums=(episode.checksums[0] ^ 1,) + tuple(episode.checksums[1:]))
+    replayer = Replayer(corrupted)
+    replayer.seek(episode.checksum_every - 1)
+    with pytest.raises(ValueError, match="diverged"):
+        replayer.step()
+
+
+def test_no_episode_at_offset():
+    data = bytearray(to_bytes(record(0)[0]))
+    data[0] ^= 1
+    with pytest.raises(ValueError):
+        from_bytes(data)
+
+
+def test_record_games_replays():
+    episodes = record_games(str(CHECKPOINT), [0, 1, 2])
+    for episode in episodes:
+        assert episode.snake_types == ("snake", "bot")
+        assert Replayer(episode).run() == episode.game_state
@@ -0,0 +1,71 @@
+import argparse
+import math
+
+import numpy as np
+import pytest
+
+from tournament import competitor, elo_ratings, pairwise_scores, standings
+
+
+def results(name_1: str, name_2: str, wins: int, losses: int, draws: int = 0) -> list[dict]:
+    """ Records of name_1 against name_2, half of the games played from each side """
+    records = []
+    for winner, n in ((1, wins), (2, losses), (0, draws)):
+        for k in range(n):
+            if k % 2 == 0:
+                records.append({"snake_1": name_1, "snake_2": name_2, "seed": k, "winner": winner, "steps": 10})
+            else:
+                swapped = {1: 2, 2: 1, 0: 0}[winner]
+                records.append({"snake_1": name_2, "snake_2": name_1, "seed": k, "winner": swapped, "steps": 10})
+    return records
+
+
+def test_equal_results_give_equal_ratings():
+    competitors = ["a", "b", "c"]
+    records = results("a", "b", 50, 50, 20) + results("b", "c", 30, 30) + results("a", "c", 0, 0, 40)
+    ratings = elo_ratings(records, competitors)
+    for name in competitors:
+        assert ratings[name] == pytest.approx(1500)
+
+
+def test_ratings_fit_a_known_table():
+    # strengths 9 : 3 : 1, every pair scores exactly as the Bradley-Terry model predicts
+    competitors = ["a", "b", "c"]
+    records = results("a", "b", 300, 100) + results("b", "c", 300, 100) + results("a", "c", 360, 40)
+    ratings = elo_ratings(records, competitors, prior_games=1e-6)
+    step = 400 * math.log10(3)
+    assert ratings["a"] - ratings["b"] == pytest.approx(step, abs=0.1)
+    assert ratings["b"] - ratings["c"] == pytest.approx(step, abs=0.1)
+
+
+def test_prior_keeps_unbeaten_ratings_finite():
+    ratings = elo_ratings(results("a", "b", 10, 0), ["a", "b"])
+    assert all(math.isfinite(rating) for rating in ratings.values())
+    assert ratings["a"] > 1500 > ratings["b"]
+
+
+def test_standings_and_pairwise_scores():
+    competitors = ["a", "b", "c"]
+    records = results("a", "b", 6, 2, 2) + results("b", "c", 4, 4)
+    table = standings(records, competitors)
+    assert [row["name"] for row in table][0] == "a"
+    rows = {row["name"]: row for row in table}
+    assert (rows["a"]["games"], rows["a"]["wins"], rows["a"]["losses"], rows["a"]["draws"]) == (10, 6, 2, 2)
+    assert (rows["b"]["games"], rows["b"]["wins"], rows["b"]["losses"], rows["b"]["draws"]) == (18, 6, 10, 2)
+
+    scores = pairwise_scores(records, competitors)
+    assert scores[0, 1] == pytest.approx(0.7)
+    assert scores[1, 0] == pytest.approx(0.3)
+    assert scores[1, 2] == pytest.approx(0.5)
+    assert np.isnan(scores[0, 2])
+
+
+@pytest.mark.parametrize("spec", ["search:0", "search:-3", "search:x"])
+def test_search_needs_an_iteration(spec):
+    with pytest.raises(argparse.ArgumentTypeError):
+        competitor(spec)
+
+
+@pytest.mark.parametrize("spec", ["search", "search:1", "bot", "ppo_snake_6.npz"])
+def test_valid_competitors(spec):
+    assert competitor(spec) == spec
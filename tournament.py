@@ -0,0 +1,245 @@
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from evaluate import detect_env, load_model
+from events import winner
+from game import Game
+from observation import ObservationBuilder
+from snake import LEFT_TURN, RIGHT_TURN
+
+COMPETITORS = ["ppo_snake_1.npz", "ppo_snake_6.npz", "ppo_snake_safe_3.npz", "ppo_snake_safe_5.npz", "bot", "search"]
+
+
+class PolicyPlayer:
+    """ Turns a snake of a game like the environments do, with the actions of a checkpoint seeing the game as its snake """
+
+    def __init__(self, path: str, player: int, cols: int, rows: int, grid_size: int = 5, deterministic: bool = False):
+        """
+        :param path: PPO checkpoint (.zip) or exported policy (.npz), loaded once per process
+        :param player: 1 or 2, the snake driven by the policy
+        """
+        self.model = load_model(path)
+        env_type, options = detect_env(self.model, grid_size)
+        self.player = player
+        self.deterministic = deterministic
+        self.observer = ObservationBuilder(cols, rows, grid_size, deadly=env_type == "safe", player=player,
+                                           reachability=options.get("reachability", False))
+
+    def act(self, game: Game) -> None:
+        """ Set the direction of the snake for the next play_step """
+        snake = game.snake_1 if self.player == 1 else game.snake_2
+        action, _ = self.model.predict(self.observer.build(game, copy=False), deterministic=self.deterministic)
+        if action == 2:  # turn left
+            snake.direction = LEFT_TURN[snake.direction]
+        elif action == 0:  # turn right
+            snake.direction = RIGHT_TURN[snake.direction]
+
+
+def snake_type(spec: str) -> str:
+    """ Snake type of Game for a competitor, checkpoints move a snake controlled by the caller """
+    name = spec.split(":")[0]
+    if name in ("bot", "search"):
+        return name
+    return "snake"
+
+
+def play_match(
+        spec_1: str,
+        spec_2: str,
+        seeds: list[int],
+        grid_size: int = 5,
+        max_steps: int = 2000,
+        deterministic: bool = False
+) -> list[dict]:
+    """
+    Play seeded games between two competitors
+    :param spec_1: competitor of snake 1, checkpoint path, bot or search[:iterations]
+    :param spec_2: competitor of snake 2
+    :param max_steps: games still running after this many steps count as a draw
+    :return: one record per game with both competitors, seed, winner (0 for a draw) and steps
+    """
+    if spec_1.endswith(".zip") or spec_2.endswith(".zip"):
+        import torch
+        torch.set_num_threads(1)  # the matches are spread over processes already
+
+    game = Game(snake_1_type=snake_type(spec_1), snake_2_type=snake_type(spec_2))
+    players = []
+    for player, spec, snake in ((1, spec_1, game.snake_1), (2, spec_2, game.snake_2)):
+        name, _, iterations = spec.partition(":")
+        if name == "search" and iterations:
+            snake.planner.iterations = int(iterations)
+        elif snake_type(spec) == "snake":
+            players.append(PolicyPlayer(spec, player, game.board.cols, game.board.rows, grid_size, deterministic))
+
+    records = []
+    for seed in seeds:
+        game.reset(seed)
+        for player in players:
+            player.model.set_random_seed(seed)
+
+        steps = 0
+        while abs(game.game_state) != 1 and steps < max_steps:
+            for player in players:
+                player.act(game)
+            game.play_step()
+            steps += 1
+
+        records.append({"snake_1": spec_1, "snake_2": spec_2, "seed": seed, "winner": winner(game.events), "steps": steps})
+    return records
+
+
+def elo_ratings(records: list[dict], competitors: list[str], prior_games: float = 1.0, iterations: int = 500) -> dict:
+    """
+    Elo ratings fitted to all games with the Bradley-Terry model, so the order of the games does not matter.
+    Every competitor plays virtual draws against a reference rated 1500, which keeps the ratings of
+    competitors that never won or never lost finite.
+    :param prior_games: number of virtual draws per competitor
+    :return: competitor -> rating
+    """
+    index = {name: i for i, name in enumerate(competitors)}
+    reference = len(competitors)
+    scores = np.zeros((reference + 1, reference + 1))  # score of row against column, a draw counts half
+
+    for record in records:
+        i, j = index[record["snake_1"]], index[record["snake_2"]]
+        score = {1: 1.0, 2: 0.0, 0: 0.5}[record["winner"]]
+        scores[i, j] += score
+        scores[j, i] += 1 - score
+    scores[:reference, reference] += prior_games / 2
+    scores[reference, :reference] += prior_games / 2
+
+    # minorization-maximization updates of the strengths, the reference keeps strength 1
+    games = scores + scores.T
+    strength = np.ones(reference + 1)
+    for _ in range(iterations):
+        strength = scores.sum(axis=1) / (games / (strength[:, None] + strength[None, :])).sum(axis=1)
+        strength /= strength[reference]
+
+    return {name: 1500 + 400 * float(np.log10(strength[i])) for name, i in index.items()}
+
+
+def standings(records: list[dict], competitors: list[str]) -> list[dict]:
+    """ Rating, games, wins, losses and draws of every competitor, best first """
+    ratings = elo_ratings(records, competitors)
+    table = {name: {"name": name, "elo": ratings[name], "games": 0, "wins": 0, "losses": 0, "draws": 0}
+             for name in competitors}
+
+    for record in records:
+        for player, name in ((1, record["snake_1"]), (2, record["snake_2"])):
+            row = table[name]
+            row["games"] += 1
+            if record["winner"] == 0:
+                row["draws"] += 1
+            elif record["winner"] == player:
+                row["wins"] += 1
+            else:
+                row["losses"] += 1
+
+    return sorted(table.values(), key=lambda row: row["elo"], reverse=True)
+
+
+def pairwise_scores(records: list[dict], competitors: list[str]) -> np.ndarray:
+    """ Average score of the row competitor against the column competitor over both sides """
+    index = {name: i for i, name in enumerate(competitors)}
+    scores = np.zeros((len(competitors), len(competitors)))
+    games = np.zeros_like(scores)
+    for record in records:
+        i, j = index[record["snake_1"]], index[record["snake_2"]]
+        score = {1: 1.0, 2: 0.0, 0: 0.5}[record["winner"]]
+        scores[i, j] += score
+        scores[j, i] += 1 - score
+        games[i, j] += 1
+        games[j, i] += 1
+    return np.divide(scores, games, out=np.full_like(scores, np.nan), where=games > 0)
+
+
+def run_tournament(competitors: list[str], games: int, workers: int, seed: int = 0, chunk: int = 50, **kwargs) -> list[dict]:
+    """
+    Round robin, every pair of competitors plays the same seeds with both side assignments
+    :param games: games per pair and side
+    :param chunk: games per task of the process pool
+    :param kwargs: passed to play_match
+    :return: records of all games
+    """
+    seeds = list(range(seed, seed + games))
+    tasks = [(spec_1, spec_2, seeds[start:start + chunk])
+             for spec_1, spec_2 in itertools.permutations(competitors, 2)
+             for start in range(0, games, chunk)]
+
+    if workers <= 1:
+        return [record for task in tasks for record in play_match(*task, **kwargs)]
+
+    with ProcessPoolExecutor(workers, mp_context=mp.get_context("forkserver")) as pool:
+        futures = [pool.submit(play_match, *task, **kwargs) for task in tasks]
+        return [record for future in futures for record in future.result()]
+
+
+def report(table: list[dict], scores: np.ndarray, competitors: list[str]) -> str:
+    """ Human readable standings and pairwise scores """
+    width = max(len(name) for name in competitors)
+    lines = [f"{'competitor':{width}} {'elo':>7} {'games':>7} {'wins':>7} {'losses':>7} {'draws':>7}"]
+    for row in table:
+        lines.append(f"{row['name']:{width}} {row['elo']:7.0f} {row['games']:7d} {row['wins']:7d}"
+                     f" {row['losses']:7d} {row['draws']:7d}")
+
+    lines.append("")
+    lines.append(f"{'score of row vs column':{width + 2}} " + " ".join(f"{i:>6}" for i in range(len(competitors))))
+    for i, name in enumerate(competitors):
+        cells = " ".join("     -" if i == j else f"{scores[i, j]:6.2f}" for j in range(len(competitors)))
+        lines.append(f"{i} {name:{width}} {cells}")
+    return "\n".join(lines)
+
+
+def competitor(spec: str) -> str:
+    """ argparse type of a competitor, checks the iterations of search:N """
+    name, _, iterations = spec.partition(":")
+    if name == "search" and iterations and (not iterations.isdigit() or int(iterations) < 1):
+        raise argparse.ArgumentTypeError(f"Invalid competitor {spec}, the search needs at least 1 iteration: search:N")
+    return spec
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Round robin tournament between checkpoints and bots with Elo ratings")
+    parser.add_argument("competitors", nargs="*", type=competitor, default=COMPETITORS,
+                        help="checkpoints (.zip/.npz), bot or search[:iterations], by default all shipped models, bot and search")
+    parser.add_argument("--games", type=int, default=100, help="games per pair of competitors and side")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument("--chunk", type=int, default=50, help="games per task of a worker")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game of every pairing")
+    parser.add_argument("--max-steps", type=int, default=2000, help="games running longer count as a draw")
+    parser.add_argument("--grid-size", type=int, default=5, help="size of the observation window of the models")
+    parser.add_argument("--deterministic", action="store_true", help="models take their most likely action")
+    parser.add_argument("--output", default=None, help="save standings and all games as JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    competitors = list(dict.fromkeys(args.competitors))
+    assert len(competitors) >= 2, "A tournament needs at least two competitors"
+
+    start = time.perf_counter()
+    records = run_tournament(competitors, args.games, args.workers, args.seed, args.chunk, grid_size=args.grid_size,
+                             max_steps=args.max_steps, deterministic=args.deterministic)
+    elapsed = time.perf_counter() - start
+
+    table = standings(records, competitors)
+    scores = pairwise_scores(records, competitors)
+    print(report(table, scores, competitors))
+    print(f"{len(records)} games in {elapsed:.1f}s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"competitors": competitors, "standings": table, "scores": scores.tolist(), "games": records},
+                      f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
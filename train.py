@@ -29,4 +29,6 @@ else:
             obs, info = env.reset()
 
     print(f"Bot has won {env.bot_score} times")
-    print(f"AI has won {env.ai_score} times")
\ No newline at end of file
+    print(f"AI has won {env.ai_score} times")
+
+    env.close()  # shows the remaining frames for a few seconds
@@ -0,0 +1,131 @@
+import argparse
+import os
+
+from envs import ENVS
+from profiler import StepProfiler
+
+# stable_baselines3 and torch are imported where they are used, the worker processes import this module
+# to build their environment and should not pay seconds of start up for libraries they never use
+
+GAMES = 64  # games stepped together by the in-process vec envs (batch, selfplay)
+
+
+def make_env(env_type: str, grid_size: int, profile: bool = False, reachability: bool = False):
+    """
+    Factory for a headless environment, used to build the environment inside the worker process
+    :param env_type: snake/safe
+    :param grid_size: size of the observation window
+    :param profile: attach a StepProfiler to the environment
+    :param reachability: add the flood fill features of SafeSnakeEnv
+    :return: function creating the environment
+    """
+    assert not reachability or env_type == "safe", "Reachability features are only supported for the safe environment"
+    options = {"reachability": True} if reachability else {}
+
+    def _init():
+        # the worker copies every observation into shared memory, so the reused buffer can be returned
+        return ENVS[env_type](show=False, grid_size=grid_size, profiler=StepProfiler() if profile else None,
+                              copy_obs=False, **options)
+    return _init
+
+
+def build_vec_env(env_type: str, workers: int, grid_size: int = 5, seed: int = None, vec: str = "shm",
+                  profile: bool = False, reachability: bool = False, games: int = GAMES):
+    """
+    Build the vectorized training environment
+    :param env_type: snake/safe
+    :param workers: number of worker processes, one game each (shm)
+    :param vec: shm - one process per environment with shared memory observations,
+                batch - all games in one process as NumPy arrays (see batch_env.py),
+                selfplay - all games in one process against a frozen copy of the learner (see self_play.py)
+    :param profile: attach a StepProfiler to every environment, only for shm
+    :param reachability: add the flood fill features of SafeSnakeEnv, only for shm
+    :param games: number of games stepped together in this process (batch, selfplay)
+    :return: VecEnv with episode statistics
+    """
+    from stable_baselines3.common.vec_env import VecMonitor
+
+    if vec in ("batch", "selfplay"):
+        assert not profile, "Profiling is only supported for the shm environments"
+        assert not reachability, "Reachability features are only supported for the shm environments"
+
+    if vec == "batch":
+        from batch_env import BatchSnakeEnv
+        env = BatchSnakeEnv(games, env_type=env_type, grid_size=grid_size, seed=seed)
+    elif vec == "selfplay":
+        from self_play import SelfPlayVecEnv
+        env = SelfPlayVecEnv(games, env_type=env_type, grid_size=grid_size)
+        env.seed(seed)
+    else:
+        from shm_vec_env import SharedMemoryVecEnv
+        env = SharedMemoryVecEnv([make_env(env_type, grid_size, profile, reachability) for _ in range(workers)])
+        env.seed(seed)
+    return VecMonitor(env)
+
+
+def collect_profile(env) -> StepProfiler:
+    """ Merge the profilers of all worker environments """
+    profiler = StepProfiler()
+    for worker_profiler in env.get_attr("profiler"):
+        profiler.merge(worker_profiler)
+    return profiler
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Train a PPO snake agent on several worker processes")
+    parser.add_argument("--env", choices=sorted(ENVS), default="snake", help="environment to train on")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="number of worker processes (shm)")
+    parser.add_argument("--envs", type=int, default=GAMES, help="number of games in this process (batch, selfplay)")
+    parser.add_argument("--steps", type=int, default=250000, help="total number of environment steps")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the environments and the model")
+    parser.add_argument("--output", default=None, help="path of the saved model, default ppo_snake[_safe]_parallel")
+    parser.add_argument("--grid-size", type=int, default=5, help="size of the observation window")
+    parser.add_argument("--n-steps", type=int, default=None,
+                        help="rollout steps per game, by default the 2048 steps of train.py are split over the games")
+    parser.add_argument("--vec", choices=["shm", "batch", "selfplay"], default="shm",
+                        help="shm: one process per environment, batch: vectorized games in this process, "
+                             "selfplay: games in this process against a frozen copy of the learner")
+    parser.add_argument("--refresh-steps", type=int, default=20000,
+                        help="steps between refreshes of the self-play opponent")
+    parser.add_argument("--resume", default=None, help="checkpoint to continue training from")
+    parser.add_argument("--profile", default=None, help="write per-phase step timings of all workers to this .json/.csv")
+    parser.add_argument("--reachability", action="store_true",
+                        help="observe the reachable area after each move, only for --env safe")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    from stable_baselines3 import PPO
+    from self_play import SelfPlayCallback
+
+    output = args.output or ("ppo_snake_parallel" if args.env == "snake" else "ppo_snake_safe_parallel")
+    num_envs = args.workers if args.vec == "shm" else args.envs
+    n_steps = args.n_steps or max(2048 // num_envs, 64)
+
+    env = build_vec_env(args.env, args.workers, args.grid_size, args.seed, args.vec, profile=args.profile is not None,
+                        reachability=args.reachability, games=args.envs)
+
+    if args.resume:
+        model = PPO.load(args.resume, env=env, n_steps=n_steps, seed=args.seed)
+    else:
+        model = PPO("MlpPolicy", env, verbose=1, gamma=0.99, n_steps=n_steps, seed=args.seed)
+
+    # the self-play opponent is a snapshot of the model, refreshed during training
+    callback = SelfPlayCallback(env.venv, args.refresh_steps) if args.vec == "selfplay" else None
+
+    model.learn(total_timesteps=args.steps, callback=callback)
+    model.save(output)
+
+    if args.profile:
+        profiler = collect_profile(env)
+        profiler.dump(args.profile)
+        print(profiler.report())
+
+    env.close()
+
+    print(f"Saved model to {output}.zip")
+
+
+if __name__ == '__main__':
+    main()
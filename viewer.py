@@ -0,0 +1,172 @@
+import atexit
+import threading
+import time
+from collections import deque
+
+import pygame
+
+from renderer import Renderer
+
+FPS = 30
+TICK_RATE = 33  # ticks shown per second at time scale 1, the speed of the old 0.03s delay per step
+CLOSE_TIMEOUT = 5.0  # seconds close keeps showing the buffered frames before dropping the rest
+
+
+class Viewer:
+    """
+    Shows a game without slowing the simulation down to the speed of the window. The simulation publishes
+    an immutable Frame (see Game.frame) after every tick and carries on, the viewer draws the frames at a
+    fixed frame rate.
+
+    By default the frames are drawn on the thread calling publish: at most fps times per second a publish
+    handles the window events and draws the due frame, all other calls only store the frame. The window
+    stays on the main thread, which SDL requires on macOS. With threaded=True a background thread draws
+    the frames instead, for platforms where pygame allows a window off the main thread.
+
+    With a tick rate the frames are played back at tick_rate * time_scale ticks per second from a
+    buffer, several ticks are skipped per frame when fast forwarding. The buffer is bounded, when the
+    simulation runs further ahead the oldest frames are dropped instead of blocking it. Without a tick
+    rate the newest frame is shown, e.g. to spot-check a running evaluation.
+
+    Keys: + / - double or halve the time scale, closing the window stops the viewer.
+    """
+
+    def __init__(self, game, fps: int = FPS, tick_rate: float = TICK_RATE, time_scale: float = 1.0,
+                 buffer: int = 10000, threaded: bool = False):
+        """
+        :param game: Game object, sets the size of the window
+        :param fps: frames drawn per second
+        :param tick_rate: ticks shown per second at time scale 1, None always shows the newest frame
+        :param time_scale: speed up (> 1) or slow down (< 1) the playback
+        :param buffer: maximum number of frames waiting to be shown
+        :param threaded: draw on a background thread instead of in publish
+        """
+        self.game = game
+        self.fps = fps
+        self.tick_rate = tick_rate
+        self.time_scale = time_scale
+        self.threaded = threaded
+        self.frames = deque(maxlen=buffer)
+        self.last_published = None
+        self.running = False
+        self.closing = False
+        self.deadline = None  # time close stops showing the buffered frames
+        self.thread = None
+        self.renderer = None
+        self.ticks = 0.0  # ticks due for playback, fractions carry over to the next frame
+        self.last_draw = 0.0
+
+    def start(self) -> "Viewer":
+        """ Open the window, on a background thread if the viewer is threaded """
+        self.running = True
+        if self.threaded:
+            self.thread = threading.Thread(target=self.run, name="viewer", daemon=True)
+            self.thread.start()
+            # stop the thread between two frames before the interpreter kills it at exit
+            atexit.register(self.close, timeout=0)
+        else:
+            self.open()
+        return self
+
+    def open(self) -> None:
+        """ Create the window on the current thread """
+        self.renderer = Renderer(self.game, attach=False)
+        self.ticks = 0.0
+        self.last_draw = time.perf_counter()
+
+    def publish(self, game=None) -> None:
+        """
+        Hand the current state of the game to the viewer, costs one copy of the snake bodies. Draws the due
+        frame if the viewer is not threaded and the last frame was drawn at least 1 / fps seconds ago.
+        :param game: Game object, the game of the viewer by default
+        :return: None
+        """
+        if not self.running:
+            return
+
+        frame = (game or self.game).frame()
+        if self.last_published is None or frame[:2] != self.last_published[:2]:
+            self.frames.append(frame)
+            self.last_published = frame
+
+        if not self.threaded and time.perf_counter() - self.last_draw >= 1 / self.fps:
+            self.update()
+
+    def update(self) -> bool:
+        """
+        Handle the window events and draw the frame due since the last update
+        :return: whether a frame was drawn
+        """
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_PLUS, pygame.K_KP_PLUS, pygame.K_EQUALS):
+                self.time_scale *= 2
+            elif event.type == pygame.KEYDOWN and event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                self.time_scale /= 2
+
+        now = time.perf_counter()
+        elapsed = now - self.last_draw
+        self.last_draw = now
+
+        frame = None
+        if self.tick_rate is None:
+            # only the newest frame is of interest
+            while self.frames:
+                frame = self.frames.popleft()
+        else:
+            self.ticks += elapsed * self.tick_rate * self.time_scale
+            while self.ticks >= 1 and self.frames:
+                frame = self.frames.popleft()
+                self.ticks -= 1
+            if not self.frames:
+                self.ticks = min(self.ticks, 1.0)  # no credit for the time spent waiting on the simulation
+
+        if frame is not None and self.running:
+            self.renderer.draw(frame)
+        return frame is not None
+
+    def run(self) -> None:
+        """ Draw the published frames until close is called or the window is closed """
+        self.running = True
+        self.open()
+        clock = pygame.time.Clock()
+
+        while self.running and not self._done():
+            clock.tick(self.fps)
+            self.update()
+
+        self._quit()
+
+    def close(self, wait: bool = True, timeout: float = CLOSE_TIMEOUT) -> None:
+        """
+        Stop the viewer
+        :param wait: show the frames still in the buffer first, until the window is closed
+        :param timeout: seconds to show them at most, None shows all, the remaining frames are dropped
+        :return: None
+        """
+        if not wait or timeout == 0:
+            self.running = False
+        self.deadline = None if timeout is None else time.perf_counter() + timeout
+        self.closing = True
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        elif self.renderer is not None:
+            clock = pygame.time.Clock()
+            while self.running and not self._done():
+                clock.tick(self.fps)
+                self.update()
+            self._quit()
+
+    def _done(self) -> bool:
+        """ close was called and the buffer is shown or the time to show it is up """
+        return self.closing and (not self.frames or self.deadline is not None and time.perf_counter() > self.deadline)
+
+    def _quit(self) -> None:
+        """ Drop the remaining frames and close the window """
+        self.running = False
+        self.frames.clear()
+        self.renderer = None
+        pygame.quit()